@@ -1,17 +1,149 @@
 import os
-from openai import OpenAI
-from anthropic import Anthropic
+import asyncio
+import functools
+import weakref
+import httpx
+import orjson
+import openai
+import anthropic
+from openai import OpenAI, AsyncOpenAI
+from anthropic import Anthropic, AsyncAnthropic
+from aiolimiter import AsyncLimiter
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 from sqlalchemy import text
-from database import engine
-from generate_prompt import create_rfp_prompt, convert_prompt_to_claude, find_similar_matches_and_generate_prompt
+from database import connection_scope, engine, has_semantic_cache_columns
+from generate_prompt import create_rfp_prompt, create_rfp_prompt_claude, convert_prompt_to_claude, find_similar_matches_and_generate_prompt
+from response_cache import cached_response
+import semantic_cache
 import logging
 import traceback
 import os
 
 # Configure logging
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shared HTTP settings for all provider clients: HTTP/2 with a keep-alive pool
+# so repeated calls reuse connections instead of doing a new TCP+TLS handshake.
+# The pools are built through each SDK's DefaultHttpxClient classes: anthropic 1.x
+# (e.g. 1.13) runs on the httpx2 fork and rejects plain httpx.Client objects, so
+# the clients of one SDK share a pool (OpenAI and DeepSeek) and Anthropic has its own.
+HTTP_TIMEOUT = 60.0
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=40)
+
+# Top similar-match score at or above which the matched response is reused as-is
+# instead of generating a new one (set above 1 to disable)
+SIMILARITY_REUSE_THRESHOLD = float(os.environ.get("SIMILARITY_REUSE_THRESHOLD", 0.98))
+
+# Semantic cache: a generated final_response of another requirement whose embedding
+# is at least this similar is returned without calling an LLM (set above 1 to disable)
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", 0.95))
+
+# Generated responses older than this are not served from the semantic cache; 0 disables expiry
+SEMANTIC_CACHE_TTL_DAYS = int(os.environ.get("SEMANTIC_CACHE_TTL_DAYS", 30))
+
+# Number of requirements processed concurrently by get_llm_responses_batch
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 10))
+
+# Number of results written per transaction by save_llm_responses; batch runs
+# also flush their results whenever this many are pending
+SAVE_BATCH_SIZE = int(os.environ.get("SAVE_BATCH_SIZE", 500))
+
+# Per-provider request budget (requests per minute) for concurrent calls
+PROVIDER_REQUESTS_PER_MINUTE = int(os.environ.get("PROVIDER_REQUESTS_PER_MINUTE", 500))
+
+# Maximum number of in-flight requests per provider. Defaults to BATCH_CONCURRENCY
+# so a batch's first-round MoA calls never queue behind each other; the synthesis
+# calls then share OpenAI's slots with them
+PROVIDER_MAX_CONCURRENCY = int(os.environ.get("PROVIDER_MAX_CONCURRENCY", BATCH_CONCURRENCY))
+
+# Deadline (seconds) for each provider call, retries included: MoA providers
+# that miss it are dropped from the synthesis, a synthesis that misses it falls
+# back to the best individual response, and a single-model request fails
+LLM_CALL_TIMEOUT = float(os.environ.get("LLM_CALL_TIMEOUT", 30))
+
+# Output budget of each completion: the prompt asks for under 350 words, and output
+# tokens dominate the latency of a call
+RESPONSE_MAX_TOKENS = int(os.environ.get("RESPONSE_MAX_TOKENS", 600))
+
+# Stop generating at meta-text the prompt forbids anyway
+RESPONSE_STOP_SEQUENCES = ["\n\nHere's", "Draft Response"]
+
+# Transient provider errors worth retrying. The SDKs' own retries are disabled
+# (max_retries=0) so a call is never retried twice over; this covers what they
+# retried: rate limits, timeouts and connection errors (APITimeoutError is an
+# APIConnectionError), 5xx, and Anthropic's 529 overloaded, which newer SDK
+# releases raise as OverloadedError instead of InternalServerError.
+RETRYABLE_ERRORS = tuple(
+    error for error in (
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+        anthropic.RateLimitError,
+        anthropic.APIConnectionError,
+        anthropic.InternalServerError,
+        getattr(anthropic, 'OverloadedError', None),
+    ) if error is not None
+)
+
+_retry_policy = retry(
+    stop=stop_after_attempt(3),
+    wait=wait_random_exponential(multiplier=1, max=10),
+    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+    reraise=True
+)
+
+def _load_templated_categories(path):
+    """
+    Load the templated answers of boilerplate requirement categories.
+
+    Args:
+        path: JSON file mapping a category to a str.format_map template over the
+              requirement fields ({requirement}, {category}), or None
+
+    Returns:
+        dict: Lower-cased category -> template; entries whose template is not a
+              string are skipped
+    """
+    if not path:
+        return {}
+    try:
+        with open(path, 'rb') as f:
+            templates = orjson.loads(f.read())
+        categories = {}
+        for category, template in templates.items():
+            if not isinstance(template, str):
+                logger.error(f"Ignoring the template of category '{category}' in {path}: not a string")
+                continue
+            categories[category.strip().lower()] = template
+        return categories
+    except (OSError, ValueError, AttributeError) as e:
+        logger.error(f"Error loading templated categories from {path}: {str(e)}")
+        return {}
+
+# Requirements of these categories are answered from a stored template instead of
+# an LLM (no templates unless TEMPLATED_CATEGORIES_PATH names a JSON file)
+TEMPLATED_CATEGORIES = _load_templated_categories(os.environ.get("TEMPLATED_CATEGORIES_PATH"))
+
+def _templated_response(requirement):
+    """
+    Fill in the template of a requirement's category.
+
+    Args:
+        requirement: Requirement mapping
+
+    Returns:
+        str: The templated answer, or None if the category has no (usable) template
+    """
+    template = TEMPLATED_CATEGORIES.get((requirement["category"] or "").strip().lower())
+    if template is None:
+        return None
+    try:
+        return template.format_map({"requirement": requirement["requirement"], "category": requirement["category"]})
+    except (KeyError, IndexError, ValueError, AttributeError) as e:
+        logger.error(f"Invalid template for category '{requirement['category']}': {str(e)}")
+        return None
+
 def extract_text(response):
     """
     Extract clean text from Claude's TextBlock response.
@@ -22,102 +154,93 @@ def extract_text(response):
     Returns:
         str: Clean text without TextBlock wrapper
     """
-    print(f"\n==== EXTRACT_TEXT DEBUG ====")
-    print(f"Input response type: {type(response)}")
-    print(f"Input response repr: {repr(response)[:150]}...")
+    # Fast path for the common Anthropic SDK shape: a Message whose content is a
+    # list of TextBlocks. Anything else falls through to the slower probing below.
+    try:
+        result = ' '.join(block.text for block in response.content)
+        if result:
+            return result
+    except (AttributeError, TypeError):
+        pass
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("EXTRACT_TEXT: Fast path not applicable for response type %s", type(response))
+        logger.debug("EXTRACT_TEXT: Input response repr: %s...", repr(response)[:150])
     
     # Handle direct string
     if isinstance(response, str):
-        print(f"EXTRACT_TEXT: Response is already a string of length {len(response)}")
-        print(f"EXTRACT_TEXT: String sample: {response[:100]}...")
-        print(f"==== END EXTRACT_TEXT DEBUG ====\n")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("EXTRACT_TEXT: Response is already a string of length %s", len(response))
+            logger.debug("EXTRACT_TEXT: String sample: %s...", response[:100])
         return response
         
     # Handle content attribute (new Anthropic API)
     if hasattr(response, 'content'):
-        print(f"EXTRACT_TEXT: Response has content attribute")
-        print(f"EXTRACT_TEXT: Content type: {type(response.content)}")
+        logger.debug("EXTRACT_TEXT: Response has content attribute")
+        logger.debug("EXTRACT_TEXT: Content type: %s", type(response.content))
         
         if isinstance(response.content, list):
-            print(f"EXTRACT_TEXT: Content is a list of length {len(response.content)}")
-            print(f"EXTRACT_TEXT: First item type: {type(response.content[0]) if response.content else 'N/A'}")
+            logger.debug("EXTRACT_TEXT: Content is a list of length %s", len(response.content))
             
             # Handle TextBlock objects
             try:
                 # First try to extract using specific API structure
                 result = ' '.join(block.text for block in response.content if hasattr(block, 'text'))
-                print(f"EXTRACT_TEXT: Joined text blocks, result length: {len(result)}")
-                print(f"EXTRACT_TEXT: Result sample: {result[:100]}...")
+                logger.debug("EXTRACT_TEXT: Joined text blocks, result length: %s", len(result))
                 if result:
-                    print(f"==== END EXTRACT_TEXT DEBUG ====\n")
                     return result
             except Exception as e:
-                print(f"EXTRACT_TEXT: Error extracting from content list: {str(e)}")
+                logger.debug("EXTRACT_TEXT: Error extracting from content list: %s", e)
             
             # If that fails, try alternative extraction methods
             try:
                 # For Claude API v3+, try to extract content from the first item if it's a dict with 'text'
                 if response.content and isinstance(response.content[0], dict) and 'text' in response.content[0]:
                     result = response.content[0]['text']
-                    print(f"EXTRACT_TEXT: Extracted text from content[0]['text'], length: {len(result)}")
-                    print(f"EXTRACT_TEXT: Result sample: {result[:100]}...")
-                    print(f"==== END EXTRACT_TEXT DEBUG ====\n")
+                    logger.debug("EXTRACT_TEXT: Extracted text from content[0]['text'], length: %s", len(result))
                     return result
             except Exception as e:
-                print(f"EXTRACT_TEXT: Error with alternative extraction: {str(e)}")
+                logger.debug("EXTRACT_TEXT: Error with alternative extraction: %s", e)
                 
             # Last fallback for content list
             try:
                 content_str = str(response.content)
-                print(f"EXTRACT_TEXT: Converting content list to string, length: {len(content_str)}")
-                print(f"EXTRACT_TEXT: Content string sample: {content_str[:100]}...")
-                print(f"==== END EXTRACT_TEXT DEBUG ====\n")
+                logger.debug("EXTRACT_TEXT: Converting content list to string, length: %s", len(content_str))
                 return content_str
             except Exception as e:
-                print(f"EXTRACT_TEXT: Error converting content list to string: {str(e)}")
+                logger.debug("EXTRACT_TEXT: Error converting content list to string: %s", e)
             
         elif isinstance(response.content, str):
-            print(f"EXTRACT_TEXT: Content is a string of length {len(response.content)}")
-            print(f"EXTRACT_TEXT: String sample: {response.content[:100]}...")
-            print(f"==== END EXTRACT_TEXT DEBUG ====\n")
+            logger.debug("EXTRACT_TEXT: Content is a string of length %s", len(response.content))
             return response.content
             
         else:
             # Try as string anyway
-            print(f"EXTRACT_TEXT: Content is of type {type(response.content)}")
-            print(f"EXTRACT_TEXT: Converting to string: {str(response.content)[:100]}...")
-            print(f"==== END EXTRACT_TEXT DEBUG ====\n")
+            logger.debug("EXTRACT_TEXT: Content is of type %s, converting to string", type(response.content))
             return str(response.content)
             
     # Handle direct TextBlock object
     if hasattr(response, 'text'):
-        print(f"EXTRACT_TEXT: Response has text attribute")
-        print(f"EXTRACT_TEXT: Text length: {len(response.text)}")
-        print(f"EXTRACT_TEXT: Text sample: {response.text[:100]}...")
-        print(f"==== END EXTRACT_TEXT DEBUG ====\n")
+        logger.debug("EXTRACT_TEXT: Response has text attribute of length %s", len(response.text))
         return response.text
     
     # Try common properties for modern Claude API
     if hasattr(response, 'message') and hasattr(response.message, 'content'):
-        print(f"EXTRACT_TEXT: Found response.message.content")
+        logger.debug("EXTRACT_TEXT: Found response.message.content")
         try:
             content = response.message.content
             if isinstance(content, list) and content and hasattr(content[0], 'text'):
                 result = content[0].text
-                print(f"EXTRACT_TEXT: Extracted from message.content[0].text, length: {len(result)}")
-                print(f"EXTRACT_TEXT: Result sample: {result[:100]}...")
-                print(f"==== END EXTRACT_TEXT DEBUG ====\n")
+                logger.debug("EXTRACT_TEXT: Extracted from message.content[0].text, length: %s", len(result))
                 return result
         except Exception as e:
-            print(f"EXTRACT_TEXT: Error extracting from message.content: {str(e)}")
+            logger.debug("EXTRACT_TEXT: Error extracting from message.content: %s", e)
     
     # Try other common properties
     for attr in ['message', 'choices', 'result', 'output']:
         if hasattr(response, attr):
-            print(f"EXTRACT_TEXT: Response has {attr} attribute")
             attr_value = getattr(response, attr)
-            print(f"EXTRACT_TEXT: {attr} type: {type(attr_value)}")
-            print(f"EXTRACT_TEXT: {attr} repr: {repr(attr_value)[:100]}...")
+            logger.debug("EXTRACT_TEXT: Response has %s attribute of type %s", attr, type(attr_value))
             
             # If we have choices, try to extract content from there (common in API responses)
             if attr == 'choices' and isinstance(attr_value, list) and attr_value:
@@ -125,23 +248,103 @@ def extract_text(response):
                     choice = attr_value[0]
                     if hasattr(choice, 'message') and hasattr(choice.message, 'content'):
                         content = choice.message.content
-                        print(f"EXTRACT_TEXT: Found content in choices[0].message.content: {content[:100]}...")
-                        print(f"==== END EXTRACT_TEXT DEBUG ====\n")
+                        logger.debug("EXTRACT_TEXT: Found content in choices[0].message.content")
                         return content
                 except Exception as e:
-                    print(f"EXTRACT_TEXT: Error extracting from choices: {str(e)}")
+                    logger.debug("EXTRACT_TEXT: Error extracting from choices: %s", e)
         
     # Last resort fallback
     result = str(response)
-    print(f"EXTRACT_TEXT: Using last resort fallback")
-    print(f"EXTRACT_TEXT: Fallback result length: {len(result)}")
-    print(f"EXTRACT_TEXT: Fallback sample: {result[:100]}...")
-    print(f"==== END EXTRACT_TEXT DEBUG ====\n")
+    logger.debug("EXTRACT_TEXT: Using last resort fallback, result length: %s", len(result))
     return result
 
+# Provider API keys, read once at import
+_OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+_DEEPSEEK_API_KEY = os.environ.get("DEEPSEEK_API_KEY")
+_ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
+
+# Configuration map for supported models, built once at import
+_MODEL_CONFIGS = {
+    'openai': {
+        'normalized_name': 'openai',
+        'display_name': 'OpenAI',
+        'sdk': openai,
+        'client_class': OpenAI,
+        'async_client_class': AsyncOpenAI,
+        'client_args': {
+            'api_key': _OPENAI_API_KEY,
+            'max_retries': 0,
+        },
+        'client_kwargs': {},
+        'completion_args': {
+            'model': 'gpt-4',
+            'max_tokens': RESPONSE_MAX_TOKENS,
+            'stop': RESPONSE_STOP_SEQUENCES,
+            'temperature': 0.2,
+            'user': "private-user",
+            'extra_headers': {
+                "HTTP-Referer": "null",
+                "X-Data-Use-Consent": "false"
+            }
+        },
+        'requires_system_message_handling': False,
+        'response_handler': lambda response: response.choices[0].message.content.strip()
+    },
+    'deepseek': {
+        'normalized_name': 'deepseek',
+        'display_name': 'DeepSeek',
+        'sdk': openai,
+        'client_class': OpenAI,
+        'async_client_class': AsyncOpenAI,
+        'client_args': {
+            'api_key': _DEEPSEEK_API_KEY,
+            'max_retries': 0,
+            'base_url': "https://api.deepseek.com/v1",
+        },
+        'client_kwargs': {
+            'default_headers': {
+                "X-Privacy-Mode": "strict",
+                "X-Data-Collection": "disabled"
+            }
+        },
+        'completion_args': {
+            'model': 'deepseek-chat',
+            'max_tokens': RESPONSE_MAX_TOKENS,
+            'stop': RESPONSE_STOP_SEQUENCES,
+            'temperature': 0.2
+        },
+        'requires_system_message_handling': False,
+        'response_handler': lambda response: response.choices[0].message.content.strip()
+    },
+    'anthropic': {
+        'normalized_name': 'anthropic',
+        'display_name': 'Anthropic',
+        'sdk': anthropic,
+        'client_class': Anthropic,
+        'async_client_class': AsyncAnthropic,
+        'client_args': {
+            'api_key': _ANTHROPIC_API_KEY,
+            'max_retries': 0,
+        },
+        'client_kwargs': {},
+        'completion_args': {
+            'model': "claude-3-7-sonnet-20250219",
+            'max_tokens': RESPONSE_MAX_TOKENS,
+            'stop_sequences': RESPONSE_STOP_SEQUENCES,
+            'temperature': 0.2
+        },
+        'requires_system_message_handling': True,
+        'response_handler': extract_text
+    }
+}
+
+@functools.lru_cache(maxsize=8)
 def get_model_config(model_name):
     """
     Return configuration for a specific model.
+
+    The configurations are shared module-level dicts, so they must be treated as
+    read-only (copy ``completion_args`` before modifying it).
     
     Args:
         model_name: The name of the model to get configuration for
@@ -156,175 +359,388 @@ def get_model_config(model_name):
     if normalized_name == 'claude':
         normalized_name = 'anthropic'
     
-    # Configuration map for supported models
-    model_configs = {
-        'openai': {
-            'display_name': 'OpenAI',
-            'client_class': OpenAI,
-            'client_args': {
-                'api_key': os.environ.get("OPENAI_API_KEY"),
-            },
-            'client_kwargs': {},
-            'completion_args': {
-                'model': 'gpt-4',
-                'temperature': 0.2,
-                'user': "private-user",
-                'extra_headers': {
-                    "HTTP-Referer": "null",
-                    "X-Data-Use-Consent": "false"
-                }
-            },
-            'requires_system_message_handling': False,
-            'response_handler': lambda response: response.choices[0].message.content.strip()
-        },
-        'deepseek': {
-            'display_name': 'DeepSeek',
-            'client_class': OpenAI,
-            'client_args': {
-                'api_key': os.environ.get("DEEPSEEK_API_KEY"),
-                'base_url': "https://api.deepseek.com/v1",
-            },
-            'client_kwargs': {
-                'default_headers': {
-                    "X-Privacy-Mode": "strict",
-                    "X-Data-Collection": "disabled"
-                }
-            },
-            'completion_args': {
-                'model': 'deepseek-chat',
-                'temperature': 0.2
-            },
-            'requires_system_message_handling': False,
-            'response_handler': lambda response: response.choices[0].message.content.strip()
-        },
-        'anthropic': {
-            'display_name': 'Anthropic',
-            'client_class': Anthropic,
-            'client_args': {
-                'api_key': os.environ.get("ANTHROPIC_API_KEY"),
-            },
-            'client_kwargs': {},
-            'completion_args': {
-                'model': "claude-3-7-sonnet-20250219",
-                'max_tokens': 4000,
-                'temperature': 0.2
-            },
-            'requires_system_message_handling': True,
-            'response_handler': extract_text
-        }
-    }
+    try:
+        return _MODEL_CONFIGS[normalized_name]
+    except KeyError:
+        raise ValueError(f"Unsupported model: {model_name}") from None
+
+def _normalized_model_name(model):
+    """
+    Return the normalized name a model's results are saved under (model_provider).
+
+    Args:
+        model: Model name ('openAI', 'deepseek', 'anthropic'/'claude', or 'moa')
+
+    Returns:
+        str: The normalized model name
+    """
+    try:
+        return get_model_config(model)['normalized_name']
+    except ValueError:
+        # Fallback for 'moa' which doesn't have a specific config
+        return model.lower()
+
+@functools.lru_cache(maxsize=None)
+def _http_client(sdk):
+    """
+    Return the shared HTTP connection pool for the clients of a provider SDK.
+
+    Args:
+        sdk: The provider SDK module (openai or anthropic)
+
+    Returns:
+        The SDK's DefaultHttpxClient
+    """
+    return sdk.DefaultHttpxClient(http2=True, timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+
+@functools.lru_cache(maxsize=8)
+def _client(normalized_name):
+    """
+    Return the shared API client for a model, creating it on first use.
+
+    Args:
+        normalized_name: Normalized model name (e.g. 'openai', 'anthropic')
+
+    Returns:
+        The provider SDK client
+    """
+    config = get_model_config(normalized_name)
+    return config['client_class'](**config['client_args'], **config.get('client_kwargs', {}), http_client=_http_client(config['sdk']))
+
+# Async clients, their HTTP pools and the rate limiters are bound to the event
+# loop that created them, so they are cached per loop instead of process-wide
+_loop_resources = weakref.WeakKeyDictionary()
+
+def _get_loop_resources():
+    """
+    Return the async resources of the running event loop, creating them on first use.
+
+    Returns:
+        dict: The 'http' (pool per SDK), 'clients', 'limiters' and 'semaphores' caches
+    """
+    loop = asyncio.get_running_loop()
+    resources = _loop_resources.get(loop)
+    if resources is None:
+        resources = {'http': {}, 'clients': {}, 'limiters': {}, 'semaphores': {}}
+        _loop_resources[loop] = resources
+    return resources
+
+def _async_client(normalized_name):
+    """
+    Return the async API client for a model on the running event loop.
+
+    Args:
+        normalized_name: Normalized model name (e.g. 'openai', 'anthropic')
+
+    Returns:
+        The provider SDK async client
+    """
+    resources = _get_loop_resources()
+    clients = resources['clients']
+    if normalized_name not in clients:
+        config = get_model_config(normalized_name)
+        # The async clients of one SDK on this loop share one HTTP/2 connection pool
+        pools = resources['http']
+        sdk_name = config['sdk'].__name__
+        if sdk_name not in pools:
+            pools[sdk_name] = config['sdk'].DefaultAsyncHttpxClient(http2=True, timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+        http_client = pools[sdk_name]
+        clients[normalized_name] = config['async_client_class'](**config['client_args'], **config.get('client_kwargs', {}), http_client=http_client)
+    return clients[normalized_name]
+
+def _rate_limiter(normalized_name):
+    """
+    Return the request rate limiter for a provider on the running event loop.
+
+    Args:
+        normalized_name: Normalized model name (e.g. 'openai', 'anthropic')
+
+    Returns:
+        AsyncLimiter: Limiter allowing PROVIDER_REQUESTS_PER_MINUTE requests per minute
+    """
+    limiters = _get_loop_resources()['limiters']
+    if normalized_name not in limiters:
+        limiters[normalized_name] = AsyncLimiter(PROVIDER_REQUESTS_PER_MINUTE, 60)
+    return limiters[normalized_name]
+
+def _provider_semaphore(normalized_name):
+    """
+    Return the in-flight request cap for a provider on the running event loop.
+
+    Args:
+        normalized_name: Normalized model name (e.g. 'openai', 'anthropic')
+
+    Returns:
+        asyncio.Semaphore: Semaphore allowing PROVIDER_MAX_CONCURRENCY concurrent requests
+    """
+    semaphores = _get_loop_resources()['semaphores']
+    if normalized_name not in semaphores:
+        semaphores[normalized_name] = asyncio.Semaphore(PROVIDER_MAX_CONCURRENCY)
+    return semaphores[normalized_name]
+
+async def _close_async_clients():
+    """Close the async HTTP connection pools opened on the running event loop."""
+    resources = _loop_resources.pop(asyncio.get_running_loop(), None)
+    if resources:
+        for http_client in resources['http'].values():
+            await http_client.aclose()
+
+def _run_async(coro):
+    """
+    Run a coroutine on a new event loop, closing the async clients it opened.
+
+    Args:
+        coro: The coroutine to run
+
+    Returns:
+        The coroutine's result
+    """
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await _close_async_clients()
+    return asyncio.run(runner())
+
+def _build_completion_args(config, prompt, max_tokens=None):
+    """
+    Build the provider-specific completion arguments for a prompt.
+
+    Args:
+        config: Model configuration returned by get_model_config
+        prompt: The prompt to send to the LLM
+        max_tokens: Output token limit overriding the model's default (optional)
+
+    Returns:
+        dict: Keyword arguments for the provider's completion call
+    """
+    completion_args = config['completion_args'].copy()
+    if max_tokens is not None:
+        completion_args['max_tokens'] = max_tokens
+
+    # Handle system message for models that require it separately
+    if config['requires_system_message_handling']:
+        # Default system message
+        system_message = "All responses and data must be treated as private and confidential. Do not use for training or any other purpose."
+        
+        # Extract system message from prompt if present
+        for msg in prompt:
+            if msg.get('role') == 'system':
+                system_message = msg.get('content', system_message)
+                break
+        
+        # Filter out system messages for the messages parameter
+        messages = [msg for msg in prompt if msg.get('role') != 'system']
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s prompt - System: %s...", config['display_name'], system_message[:200])
+            logger.debug("%s prompt - Messages: %s...", config['display_name'], orjson.dumps(messages).decode()[:200])
+        
+        # The system message is handled separately from the messages
+        completion_args['messages'] = messages
+        completion_args['system'] = system_message
+    else:
+        # Standard completion for models that don't need special system message handling
+        completion_args['messages'] = prompt
+
+    return completion_args
+
+def _validate_content(content, response, display_name):
+    """
+    Validate and clean up the content extracted from a model response.
+
+    Args:
+        content: Content extracted by the model-specific response handler
+        response: The raw response object from the provider
+        display_name: Human-readable name of the model
+
+    Returns:
+        str: The cleaned response content
+
+    Raises:
+        ValueError: If the content is empty or not a string
+    """
+    # Log the response for debugging; the SDK object reprs are large, so only
+    # build them when debug logging is on
+    if logger.isEnabledFor(logging.DEBUG):
+        if not isinstance(content, str):
+            logger.debug("Full %s response - Type: %s", display_name, type(response))
+            logger.debug("Full %s response - Response: %r", display_name, response)
+            logger.debug("Full %s response - Extracted content: %r", display_name, content)
+        else:
+            logger.debug("Full %s response - Content preview: %s...", display_name, content[:200])
     
-    # Return the configuration for the requested model
-    if normalized_name in model_configs:
-        config = model_configs[normalized_name]
-        # Add the normalized name to the config
-        config['normalized_name'] = normalized_name
-        return config
+    # Validate and clean up the content
+    if isinstance(content, str):
+        content = content.strip()
+        logger.info(f"Successfully generated {display_name} response of length: {len(content)} characters")
+        
+        # Fail rather than return a placeholder, so an empty completion is never
+        # cached or saved as the response
+        if not content:
+            logger.warning(f"Empty response from {display_name}")
+            raise ValueError(f"Empty response from {display_name}")
+        
+        return content
     else:
-        raise ValueError(f"Unsupported model: {model_name}")
+        raise ValueError(f"Invalid response format from {display_name}: {type(content)}")
 
-def prompt_gpt(prompt, model_name='openAI'):
+@cached_response(get_model_config)
+@_retry_policy
+def prompt_gpt(prompt, model_name='openAI', max_tokens=None):
     """
     Generic function to prompt any supported LLM.
     
     Args:
         prompt: The prompt to send to the LLM
         model_name: The name of the model to use (e.g., 'openAI', 'anthropic', 'deepseek')
+        max_tokens: Output token limit overriding RESPONSE_MAX_TOKENS (optional)
         
     Returns:
-        str: The model's response
+        str: The model's response (served from the on-disk response cache when available)
     """
     try:
         # Get the configuration for the specified model
         config = get_model_config(model_name)
-        normalized_name = config['normalized_name']
         display_name = config['display_name']
         
         logger.info(f"Calling {display_name} API with prompt")
         
-        # Initialize the client with the configuration
-        client = config['client_class'](**config['client_args'], **config.get('client_kwargs', {}))
+        # Reuse the shared client (and its connection pool)
+        client = _client(config['normalized_name'])
         
-        # Handle system message for models that require it separately
+        completion_args = _build_completion_args(config, prompt, max_tokens)
         if config['requires_system_message_handling']:
-            # Default system message
-            system_message = "All responses and data must be treated as private and confidential. Do not use for training or any other purpose."
-            
-            # Extract system message from prompt if present
-            for msg in prompt:
-                if msg.get('role') == 'system':
-                    system_message = msg.get('content', system_message)
-                    break
-            
-            # Filter out system messages for the messages parameter
-            messages = [msg for msg in prompt if msg.get('role') != 'system']
-            
-            print(f"======= {display_name.upper()} PROMPT =======")
-            print(f"System: {system_message[:200]}...")
-            print(f"Messages: {str(messages)[:200]}...")
-            print("===============================")
-            
-            # Create the completion with the system message handled separately
-            completion_args = config['completion_args'].copy()
-            completion_args['messages'] = messages
-            completion_args['system'] = system_message
-            
             response = client.messages.create(**completion_args)
         else:
-            # Standard completion for models that don't need special system message handling
-            completion_args = config['completion_args'].copy()
-            completion_args['messages'] = prompt
-            
             response = client.chat.completions.create(**completion_args)
         
         # Handle the response using the model-specific handler
         content = config['response_handler'](response)
         
-        # Log the response for debugging
-        print(f"====== FULL {display_name.upper()} RESPONSE ======")
-        if not isinstance(content, str):
-            print(f"Type: {type(response)}")
-            print(f"Response object: {response}")
-            print(f"Extracted content: {content}")
-        else:
-            print(f"Content preview: {content[:200]}...")
-        print("=======================================")
-        
-        # Validate and clean up the content
-        if isinstance(content, str):
-            content = content.strip()
-            logger.info(f"Successfully generated {display_name} response of length: {len(content)} characters")
-            
-            # Ensure we don't return an empty string
-            if not content:
-                print(f"WARNING: Empty response from {display_name}, using fallback content")
-                return f"The system encountered an issue with the {display_name} response. Please try again or use another model."
+        return _validate_content(content, response, display_name)
             
-            return content
+    except Exception as e:
+        logger.error(f"Error generating response from {model_name}: {str(e)}")
+        raise
+
+async def prompt_gpt_stream(prompt, model_name='openAI', max_tokens=None):
+    """
+    Stream a completion from any supported LLM, yielding text deltas as they arrive.
+
+    The provider's concurrency and request budget slot is held until the stream
+    is exhausted or closed.
+
+    Args:
+        prompt: The prompt to send to the LLM
+        model_name: The name of the model to use (e.g., 'openAI', 'anthropic', 'deepseek')
+        max_tokens: Output token limit overriding RESPONSE_MAX_TOKENS (optional)
+
+    Yields:
+        str: Text deltas of the response
+    """
+    config = get_model_config(model_name)
+    client = _async_client(config['normalized_name'])
+    completion_args = _build_completion_args(config, prompt, max_tokens)
+
+    # Stay within the provider's concurrency and request budget when many calls run concurrently
+    async with _provider_semaphore(config['normalized_name']), _rate_limiter(config['normalized_name']):
+        if config['requires_system_message_handling']:
+            async with client.messages.stream(**completion_args) as stream:
+                async for text_delta in stream.text_stream:
+                    yield text_delta
         else:
-            raise ValueError(f"Invalid response format from {display_name}: {type(content)}")
+            stream = await client.chat.completions.create(**completion_args, stream=True)
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+@cached_response(get_model_config)
+@_retry_policy
+async def prompt_gpt_async(prompt, model_name='openAI', max_tokens=None):
+    """
+    Asynchronous variant of prompt_gpt using the providers' native async clients.
+
+    The completion is read from prompt_gpt_stream, so tokens are consumed while the
+    model is still generating, and the chunks are joined once at the end.
+    
+    Args:
+        prompt: The prompt to send to the LLM
+        model_name: The name of the model to use (e.g., 'openAI', 'anthropic', 'deepseek')
+        max_tokens: Output token limit overriding RESPONSE_MAX_TOKENS (optional)
+        
+    Returns:
+        str: The model's response (served from the on-disk response cache when available)
+    """
+    try:
+        # Get the configuration for the specified model
+        config = get_model_config(model_name)
+        display_name = config['display_name']
+        
+        logger.info(f"Calling {display_name} API with prompt (async)")
+        
+        chunks = [text_delta async for text_delta in prompt_gpt_stream(prompt, model_name, max_tokens)]
+        content = "".join(chunks)
+        
+        return _validate_content(content, chunks, display_name)
             
     except Exception as e:
         logger.error(f"Error generating response from {model_name}: {str(e)}")
         raise
 
-def create_synthesized_response_prompt(requirement, responses):
+async def _prompt_claude_async(prompt):
     """
-    Generate a prompt to synthesize multiple RFP responses into a cohesive, impactful response.
+    Convert a standard prompt to Claude format and send it to Anthropic.
+
+    The conversion happens inside the task so no Claude prompt is built (or kept
+    in memory alongside the standard one) unless the Anthropic call actually runs.
 
     Args:
-        requirement: The specific RFP requirement to address.
-        responses: List of individual responses to evaluate and synthesize.
+        prompt: List of message dictionaries in standard format
 
     Returns:
-        List of messages for the LLM.
+        str: The model's response
     """
-    system_message = {
-        "role": "system",
-        "content": f"""You are a senior RFP specialist at a leading financial technology company with 15+ years of experience in winning complex RFPs in the wealth management domain.
+    claude_prompt = convert_prompt_to_claude(prompt)
+    logger.debug("Claude prompt created - Contains %s message objects", len(claude_prompt))
+    return await prompt_gpt_async(claude_prompt, 'anthropic')
+
+async def _gather_model_responses(model_calls):
+    """
+    Await several model calls concurrently, each bounded by LLM_CALL_TIMEOUT.
+
+    Args:
+        model_calls: List of (model_name, awaitable) tuples
+
+    Returns:
+        list: One response per model, or None where the model failed or timed out
+    """
+    results = await asyncio.gather(
+        *(asyncio.wait_for(model_call, timeout=LLM_CALL_TIMEOUT) for _, model_call in model_calls),
+        return_exceptions=True
+    )
+
+    responses = []
+    for (model_name, _), result in zip(model_calls, results):
+        if isinstance(result, asyncio.TimeoutError):
+            logger.error(f"{model_name} response timed out after {LLM_CALL_TIMEOUT} seconds")
+            responses.append(None)
+        elif isinstance(result, BaseException):
+            logger.error(f"Error generating {model_name} response: {str(result)}")
+            responses.append(None)
+        else:
+            logger.debug("Successfully generated %s response", model_name)
+            responses.append(result)
+    return responses
+
+# Static parts of the synthesis prompt, shared by every call (treat them as read-only).
+# The system instructions are split around the requirement they interpolate.
+_SYNTHESIS_SYSTEM_HEAD = """You are a senior RFP specialist at a leading financial technology company with 15+ years of experience in winning complex RFPs in the wealth management domain.
 
 OBJECTIVE:
-Synthesize multiple response versions into one optimal response that directly addresses the requirement: {requirement}
+Synthesize multiple response versions into one optimal response that directly addresses the requirement: """
+
+_SYNTHESIS_SYSTEM_TAIL = """
 
 EVALUATION CRITERIA:
 1. **Relevance & Impact**:
@@ -371,17 +787,9 @@ OUTPUT REQUIREMENTS:
 3. **Must Include**:
    - Concrete capabilities and specific benefits.
    - A clear, compelling value proposition tailored to the requirement."""
-    }
-
-    user_message = {
-        "role": "user",
-        "content": f"""REQUIREMENT TO ADDRESS:
-{requirement}
 
-SOURCE RESPONSES TO SYNTHESIZE:
-{responses}
-
-SYNTHESIS PROCESS:
+# Static synthesis steps appended after the requirement and source responses
+_SYNTHESIS_PROCESS = """SYNTHESIS PROCESS:
 1. **Analysis Phase**:
    - Review all responses to identify key themes, unique value points, and overlapping content.
 
@@ -399,11 +807,11 @@ SYNTHESIS PROCESS:
    - Confirm the tone is professional and the focus is on business benefits.
 
 Now, provide the synthesized response that best addresses the requirement."""
-    }
 
-    validation_message = {
-        "role": "user",
-        "content": """FINAL CHECKS:
+# Final checks sent after the source responses
+_SYNTHESIS_VALIDATION_MESSAGE = {
+    "role": "user",
+    "content": """FINAL CHECKS:
 1. Does the response directly and fully address the requirement?
 2. Is all information sourced exclusively from the provided responses?
 3. Is the response approximately 200 words in length?
@@ -412,358 +820,747 @@ Now, provide the synthesized response that best addresses the requirement."""
 6. Is the response ready for direct submission without additional editing?
 
 If any check fails, revise the response accordingly."""
+}
+
+def create_synthesized_response_prompt(requirement, responses):
+    """
+    Generate a prompt to synthesize multiple RFP responses into a cohesive, impactful response.
+
+    Args:
+        requirement: The specific RFP requirement to address.
+        responses: List of individual responses to evaluate and synthesize.
+
+    Returns:
+        List of messages for the LLM.
+    """
+    system_message = {
+        "role": "system",
+        "content": "".join([_SYNTHESIS_SYSTEM_HEAD, requirement, _SYNTHESIS_SYSTEM_TAIL])
+    }
+
+    # Assemble the user message in a single join; the source responses can be many KB
+    user_message = {
+        "role": "user",
+        "content": "".join([
+            "REQUIREMENT TO ADDRESS:\n", requirement,
+            "\n\nSOURCE RESPONSES TO SYNTHESIZE:\n", responses,
+            "\n\n", _SYNTHESIS_PROCESS
+        ])
     }
 
-    return [system_message, user_message, validation_message]
+    return [system_message, user_message, _SYNTHESIS_VALIDATION_MESSAGE]
+
+# Closest other requirement that already has a generated response (semantic cache)
+_SEMANTIC_CACHE_COLUMN = """(
+                    SELECT json_build_array(
+                        c.final_response,
+                        1 - (c.requirement_embedding <=> re.embedding)
+                    )
+                    FROM excel_requirement_responses c
+                    WHERE c.requirement_embedding IS NOT NULL
+                      AND re.embedding IS NOT NULL
+                      AND c.final_response IS NOT NULL
+                      AND c.id <> req.id
+                      AND c.model_provider = :model_provider
+                      AND (:cache_ttl_days = 0 OR c.generated_at > NOW() - make_interval(days => :cache_ttl_days))
+                    ORDER BY c.requirement_embedding <=> re.embedding
+                    LIMIT 1
+                ) as cached_response"""
 
-def get_llm_responses(requirement_id, model='moa', display_results=True, skip_similarity_search=False):
+# Built once per process (per state of the semantic cache columns)
+@functools.lru_cache(maxsize=2)
+def _load_requirements_query(semantic_cache_columns):
     """
-    Get LLM responses for a given requirement.
+    Build the query of _load_requirements: the requirements, their stored similar
+    questions, their top 5 similar matches and the closest previously generated
+    response, in a single round-trip.
 
     Args:
-        requirement_id: ID of the requirement to process
-        model: Model to use ('openAI', 'deepseek', 'anthropic'/'claude', or 'moa')
-               If 'moa', responses from all models will be synthesized
-        display_results: Whether to display the results after fetching
-        skip_similarity_search: If True, skips finding similar matches and uses existing ones in the database
+        semantic_cache_columns: Whether database.create_semantic_cache_columns has been run
+
+    Returns:
+        TextClause: The query
     """
-    print(f"\n\n==== RESPONSE GENERATION PROCESS ====")
-    print(f"Processing requirement ID: {requirement_id}")
-    print(f"Selected model: {model}")
-    print(f"====================================\n")
-    try:
-        print("\n=== Database Operations ===")
-        # First, get the requirement details and generate prompts
-        with engine.connect() as connection:
-            # Get requirement details
-            req_query = text("""
-                SELECT r.id, r.requirement, r.category
-                FROM excel_requirement_responses r
-                WHERE r.id = :req_id
-            """)
-            requirement = connection.execute(req_query, {"req_id": requirement_id}).fetchone()
-
-            if not requirement:
-                raise ValueError(f"No requirement found with ID: {requirement_id}")
-
-            print("1. Retrieved requirement details from database")
-
-            # Check if we should skip similarity search and use existing matches
-            similar_results = []
-            if skip_similarity_search:
-                print("\n=== Using Existing Similar Questions ===")
-                print("Skip similarity search flag is set - using existing similar questions")
-                # Get existing similar questions from the database
-                existing_similar_query = text("""
-                    SELECT similar_questions
-                    FROM excel_requirement_responses
-                    WHERE id = :req_id
-                """)
-                
-                try:
-                    existing_similar = connection.execute(existing_similar_query, {"req_id": requirement_id}).fetchone()
-                    if existing_similar and existing_similar[0]:
-                        print("Found existing similar questions in database")
-                        # Parse the existing similar questions string back to a list
-                        import ast
-                        similar_questions_list = ast.literal_eval(existing_similar[0])
-                        
-                        print(f"DEBUG: Similar questions loaded from database (first example): {similar_questions_list[0] if similar_questions_list else 'None'}")
-                        
-                        # We'll set similar_questions_list later, but we need similar_results format for prompt creation
-                        for idx, sq in enumerate(similar_questions_list):
-                            similar_results.append([
-                                idx,                          # id
-                                sq['question'],               # matched_requirement
-                                sq['response'],               # matched_response
-                                "",                           # category
-                                float(sq['similarity_score'])  # similarity_score
-                            ])
-                        print(f"Converted {len(similar_questions_list)} existing similar questions for use")
-                        
-                        # Debug - print the first similar result for verification
-                        if similar_results:
-                            print(f"DEBUG: First similar result converted format:")
-                            print(f"  ID: {similar_results[0][0]}")
-                            print(f"  Question: {similar_results[0][1][:50]}...")
-                            print(f"  Response: {similar_results[0][2][:50]}...")
-                            print(f"  Score: {similar_results[0][4]}")
-                    else:
-                        print("No existing similar questions found - will perform search anyway")
-                        skip_similarity_search = False  # Force search if no existing data
-                except Exception as e:
-                    print(f"Error retrieving existing similar questions: {str(e)}")
-                    print(f"Exception traceback: {traceback.format_exc()}")
-                    skip_similarity_search = False  # Force search if error occurs
-            
-            # If not skipping or if retrieving existing failed, perform similarity search
-            if not skip_similarity_search:
-                # Find similar matches and generate prompts
-                similar_query = text("""
-                    WITH requirement_embedding AS (
-                        SELECT embedding 
-                        FROM embeddings 
-                        WHERE requirement = (
-                            SELECT requirement 
-                            FROM excel_requirement_responses 
-                            WHERE id = :req_id
-                        )
-                        LIMIT 1
-                    )
-                    SELECT 
+    # The semantic cache needs the columns added by database.create_semantic_cache_columns
+    cached_response_column = _SEMANTIC_CACHE_COLUMN if semantic_cache_columns else "NULL as cached_response"
+    return text(f"""
+        WITH req AS (
+            SELECT r.id, r.requirement, r.category, r.similar_questions
+            FROM excel_requirement_responses r
+            WHERE r.id = ANY(:req_ids)
+        )
+        SELECT
+            req.id,
+            req.requirement,
+            req.category,
+            req.similar_questions,
+            re.embedding::text as embedding,
+            COALESCE((
+                SELECT json_agg(json_build_array(
+                    s.id, s.matched_requirement, s.matched_response, s.category, s.similarity_score
+                ) ORDER BY s.similarity_score DESC)
+                FROM (
+                    -- Order by the raw distance so the HNSW index can serve the top 5
+                    SELECT
                         e.id,
                         e.requirement as matched_requirement,
                         e.response as matched_response,
                         e.category,
-                        CASE 
-                            WHEN re.embedding IS NOT NULL AND e.embedding IS NOT NULL 
-                            THEN 1 - (e.embedding <=> re.embedding)
-                            ELSE 0.0
-                        END as similarity_score
+                        1 - (e.embedding <=> re.embedding) as similarity_score
                     FROM embeddings e
-                    CROSS JOIN requirement_embedding re
                     WHERE e.embedding IS NOT NULL
-                    ORDER BY similarity_score DESC
-                    LIMIT 5;
-                """)
+                      AND re.embedding IS NOT NULL
+                    ORDER BY e.embedding <=> re.embedding
+                    LIMIT 5
+                ) s
+            ), '[]'::json) as similar_matches,
+            {cached_response_column}
+        FROM req
+        -- The requirement's own embedding, looked up by its text
+        LEFT JOIN LATERAL (
+            SELECT embedding
+            FROM embeddings
+            WHERE requirement = req.requirement
+            LIMIT 1
+        ) re ON true
+    """)
 
-                try:
-                    similar_results = connection.execute(similar_query, {"req_id": requirement_id}).fetchall()
-                    print("2. Retrieved similar questions from database")
+_LOAD_REQUIREMENTS_FALLBACK_QUERY = text("""
+    SELECT r.id, r.requirement, r.category, r.similar_questions
+    FROM excel_requirement_responses r
+    WHERE r.id = ANY(:req_ids)
+""")
 
-                    if not similar_results:
-                        print("Warning: No similar questions found")
-                        similar_results = []
-                except Exception as e:
-                    print(f"Warning: Error fetching similar questions: {str(e)}")
-                    similar_results = []
-
-            # Format previous responses and similar questions
-            previous_responses = []
-            similar_questions_list = []
-            for idx, result in enumerate(similar_results, 1):
-                # Format the similar questions for the prompt in the expected dictionary format
-                previous_responses.append({
-                    "requirement": result[1],  # matched_requirement
-                    "response": result[2],     # matched_response
-                    "similarity_score": result[4]  # similarity_score as float
-                })
-                
-                # Format similar questions for API response and database storage
-                similar_questions_list.append({
-                    "question": result[1],
-                    "response": result[2],
-                    "reference": f"Response #{idx}",
-                    "similarity_score": f"{result[4]:.4f}"
-                })
-                
-            print(f"Found {len(previous_responses)} similar questions")
+def _load_requirements(requirement_ids, model_provider, skip_similarity_search=False, connection=None):
+    """
+    Load several requirements and the similar questions to use as examples for them.
 
-            # Generate prompts based on model
-            if model == 'moa':
-                print("3. Generating responses from all models")
-                print("\n=== Prompt Creation Debug ===")
-                print(f"Creating prompt with: requirement text (length {len(requirement[1])}), category: '{requirement[2]}', and {len(previous_responses)} similar responses")
-                
-                # Debug - show the first previous response if available
-                if previous_responses:
-                    print(f"First previous response data sample:")
-                    print(f"  Requirement: {previous_responses[0]['requirement'][:50]}..." if len(previous_responses[0]['requirement']) > 50 else previous_responses[0]['requirement'])
-                    print(f"  Response: {previous_responses[0]['response'][:50]}..." if len(previous_responses[0]['response']) > 50 else previous_responses[0]['response'])
-                    print(f"  Similarity: {previous_responses[0]['similarity_score']}")
-
-                # Generate responses from all models
-                openai_prompt = create_rfp_prompt(requirement[1], requirement[2], previous_responses)
-                print(f"OpenAI prompt created - Contains {len(openai_prompt)} message objects")
-                
-                claude_prompt = convert_prompt_to_claude(openai_prompt)
-                print(f"Claude prompt created - Contains {len(claude_prompt)} message objects")
+    Args:
+        requirement_ids: IDs of the requirements to load
+        model_provider: Normalized name of the requested model; the semantic cache
+            only serves responses it generated
+        skip_similarity_search: If True, uses the similar questions already stored in the database
+        connection: Database connection to use (optional; one is checked out of the pool otherwise).
+            If it is already in a transaction, committing is left to the caller
+
+    Returns:
+        dict: requirement ID -> (requirement mapping, list of (id, matched_requirement,
+        matched_response, category, similarity_score)); IDs that do not exist are left out
+    """
+    requirement_ids = list(requirement_ids)
+
+    with connection_scope(connection) as connection:
+        own_transaction = not connection.in_transaction()
+        try:
+            # Savepoint so a failed similarity search leaves the transaction usable
+            with connection.begin_nested():
+                rows = connection.execute(_load_requirements_query(has_semantic_cache_columns()), {
+                    "req_ids": requirement_ids,
+                    "model_provider": model_provider,
+                    "cache_ttl_days": SEMANTIC_CACHE_TTL_DAYS
+                }).mappings().all()
+            matched = {row["id"]: (row, row["similar_matches"]) for row in rows}
+        except Exception as e:
+            # Similarity search failures are not fatal: fall back to the requirements alone
+            logger.warning(f"Error fetching similar questions: {str(e)}")
+            rows = connection.execute(_LOAD_REQUIREMENTS_FALLBACK_QUERY, {"req_ids": requirement_ids}).mappings().all()
+            matched = {row["id"]: (row, []) for row in rows}
+        # Short transaction: never leave the connection idle in a transaction during the LLM calls
+        if own_transaction:
+            connection.commit()
+
+    logger.debug("1. Retrieved details of %s requirements from database", len(matched))
+
+    return {
+        requirement_id: (requirement, _select_similar_results(requirement, matched_results, skip_similarity_search))
+        for requirement_id, (requirement, matched_results) in matched.items()
+    }
+
+def _select_similar_results(requirement, matched_results, skip_similarity_search):
+    """
+    Pick the similar questions of a requirement: the stored ones when skipping
+    the similarity search (and they exist), the search results otherwise.
+
+    Args:
+        requirement: Requirement mapping
+        matched_results: Similarity search results for the requirement
+        skip_similarity_search: If True, prefers the similar questions already stored in the database
 
-                # Use a dictionary to store model responses
-                model_responses = {}
+    Returns:
+        list: (id, matched_requirement, matched_response, category, similarity_score) rows,
+        with similarity_score always a float
+    """
+    # Check if we should skip similarity search and use existing matches
+    similar_results = []
+    if skip_similarity_search:
+        logger.debug("Skip similarity search flag is set - using existing similar questions")
+        existing_similar = requirement["similar_questions"]
+        
+        try:
+            if existing_similar:
+                logger.debug("Found existing similar questions in database")
+                # Parse the existing similar questions JSON back to a list
+                # (a JSONB column comes back already parsed)
+                similar_questions_list = orjson.loads(existing_similar) if isinstance(existing_similar, str) else existing_similar
                 
-                # Define the models to use
-                models = [
-                    {'name': 'openai', 'prompt': openai_prompt},
-                    {'name': 'deepseek', 'prompt': openai_prompt},
-                    {'name': 'anthropic', 'prompt': claude_prompt}
-                ]
+                logger.debug("Similar questions loaded from database (first example): %s", similar_questions_list[0] if similar_questions_list else None)
                 
-                # Get responses from each model
-                for model_info in models:
-                    model_name = model_info['name']
-                    model_prompt = model_info['prompt']
-                    
-                    try:
-                        print(f"Generating response from {model_name}...")
-                        model_responses[model_name] = prompt_gpt(model_prompt, model_name)
-                        print(f"Successfully generated {model_name} response")
-                    except Exception as e:
-                        print(f"Error generating {model_name} response: {str(e)}")
-                        model_responses[model_name] = None
+                # We need similar_results format for prompt creation
+                for idx, sq in enumerate(similar_questions_list):
+                    similar_results.append([
+                        idx,                          # id
+                        sq['question'],               # matched_requirement
+                        sq['response'],               # matched_response
+                        "",                           # category
+                        float(sq['similarity_score'])  # similarity_score
+                    ])
+                logger.debug("Converted %s existing similar questions for use", len(similar_questions_list))
                 
-                # Assign responses to variables for backward compatibility
-                openai_response = model_responses.get('openai')
-                deepseek_response = model_responses.get('deepseek')
-                claude_response = model_responses.get('anthropic')
-
-                # Create synthesized prompt
-                if any([openai_response, deepseek_response, claude_response]):
-                    responses_to_synthesize = []
-                    if openai_response:
-                        responses_to_synthesize.append(f"OpenAI Response:\n{openai_response}")
-                    if deepseek_response:
-                        responses_to_synthesize.append(f"Deepseek Response:\n{deepseek_response}")
-                    if claude_response:
-                        responses_to_synthesize.append(f"Claude Response:\n{claude_response}")
-
-                    synthesis_prompt = create_synthesized_response_prompt(requirement[1], "\n\n".join(responses_to_synthesize))
-                    try:
-                        # Use openai for synthesis by default
-                        print("Generating synthesized (MOA) response...")
-                        final_response = prompt_gpt(synthesis_prompt, 'openai')
-                        print(f"Successfully generated synthesized response of length: {len(final_response)}")
-                    except Exception as e:
-                        print(f"Error generating synthesized response: {str(e)}")
-                        # Fallback to the best available individual response
-                        final_response = openai_response or deepseek_response or claude_response
-                        print(f"Using fallback response of length: {len(final_response) if final_response else 0}")
+                # Debug - log the first similar result for verification
+                if similar_results and logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("First similar result converted format:")
+                    logger.debug("  ID: %s", similar_results[0][0])
+                    logger.debug("  Question: %s...", similar_results[0][1][:50])
+                    logger.debug("  Response: %s...", similar_results[0][2][:50])
+                    logger.debug("  Score: %s", similar_results[0][4])
+            else:
+                logger.info("No existing similar questions found - will perform search anyway")
+                skip_similarity_search = False  # Force search if no existing data
+        except Exception as e:
+            logger.error(f"Error retrieving existing similar questions: {str(e)}")
+            logger.debug("Exception traceback: %s", traceback.format_exc())
+            similar_results = []
+            skip_similarity_search = False  # Force search if error occurs
+    
+    # If not skipping or if retrieving existing failed, use the similarity search results
+    if not skip_similarity_search:
+        # JSON has no float type of its own: a score of exactly 1 comes back as an int
+        similar_results = [
+            (match_id, matched_requirement, matched_response, category, float(similarity_score))
+            for match_id, matched_requirement, matched_response, category, similarity_score in matched_results
+        ]
+        logger.debug("2. Retrieved similar questions from database")
+
+        if not similar_results:
+            logger.warning("No similar questions found")
+
+    return similar_results
+
+def _load_requirement(requirement_id, model_provider, skip_similarity_search=False, connection=None):
+    """
+    Load a requirement and the similar questions to use as examples for it.
+
+    Args:
+        requirement_id: ID of the requirement to load
+        model_provider: Normalized name of the requested model
+        skip_similarity_search: If True, uses the similar questions already stored in the database
+        connection: Database connection to use (optional)
+
+    Returns:
+        tuple: (requirement mapping, list of (id, matched_requirement, matched_response, category, similarity_score))
+    """
+    loaded = _load_requirements([requirement_id], model_provider, skip_similarity_search, connection)
+    if requirement_id not in loaded:
+        raise ValueError(f"No requirement found with ID: {requirement_id}")
+    return loaded[requirement_id]
+
+def _reusable_response(requirement_id, requirement, similar_results, embedding, normalized_model):
+    """
+    Find a response that answers the requirement without calling any LLM.
+
+    The sources are tried in order and each is only consulted once the previous
+    ones have missed, so a lower-priority hit is never logged or counted as used.
+
+    Args:
+        requirement_id: ID of the requirement
+        requirement: Requirement mapping loaded by _load_requirements
+        similar_results: Similar matches of the requirement
+        embedding: The requirement embedding, or None
+        normalized_model: Normalized name of the requested model
+
+    Returns:
+        str: The reusable response, or None if the requirement needs generating
+    """
+    # A near-identical previous requirement already has the answer
+    if (similar_results and similar_results[0][4] >= SIMILARITY_REUSE_THRESHOLD
+            and similar_results[0][2] and similar_results[0][2].strip()):
+        logger.info(f"Top match similarity {similar_results[0][4]:.4f} >= {SIMILARITY_REUSE_THRESHOLD}, reusing its response without calling an LLM")
+        return similar_results[0][2]
+
+    # A semantically equivalent requirement already has a generated response
+    cached_response = requirement.get("cached_response")
+    if (cached_response and cached_response[1] is not None
+            and cached_response[1] >= SEMANTIC_CACHE_THRESHOLD
+            and cached_response[0].strip()):
+        logger.info(f"Semantic cache hit (similarity {cached_response[1]:.4f} >= {SEMANTIC_CACHE_THRESHOLD}), reusing a previously generated response")
+        return cached_response[0]
+
+    # The in-process semantic cache also sees responses not saved yet
+    local_cached_response = semantic_cache.lookup(embedding, SEMANTIC_CACHE_THRESHOLD, requirement_id, normalized_model) if embedding else None
+    if local_cached_response:
+        return local_cached_response
+
+    # Boilerplate category: its stored template answers the requirement
+    templated_response = _templated_response(requirement)
+    if templated_response:
+        logger.info(f"Category '{requirement['category']}' is templated, answering without calling an LLM")
+        return templated_response
+
+    return None
+
+async def get_llm_responses_async(requirement_id, model='moa', skip_similarity_search=False, loaded=None, connection=None):
+    """
+    Generate LLM responses for a given requirement without saving them.
+
+    Args:
+        requirement_id: ID of the requirement to process
+        model: Model to use ('openAI', 'deepseek', 'anthropic'/'claude', or 'moa')
+               If 'moa', responses from all models will be synthesized
+        skip_similarity_search: If True, skips finding similar matches and uses existing ones in the database
+        loaded: (requirement, similar results) already loaded by _load_requirements (optional)
+        connection: Database connection to load the requirement with (optional)
+
+    Returns:
+        dict: Generation result; pass it to save_llm_responses to store it
+    """
+    # Normalize the model name once for every branch below
+    normalized_model = _normalized_model_name(model)
+    is_anthropic = normalized_model == 'anthropic'
+    logger.debug("Original model: '%s', Normalized model: '%s'", model, normalized_model)
+
+    # Database access is synchronous, so keep it off the event loop
+    if loaded is None:
+        loaded = await asyncio.to_thread(_load_requirement, requirement_id, normalized_model, skip_similarity_search, connection)
+    requirement, similar_results = loaded
+
+    # Format previous responses and similar questions
+    previous_responses = []
+    similar_questions_list = []
+    for idx, (_match_id, matched_requirement, matched_response, _category, similarity_score) in enumerate(similar_results, 1):
+        # Format the similar questions for the prompt in the expected dictionary format
+        previous_responses.append({
+            "requirement": matched_requirement,
+            "response": matched_response,
+            "similarity_score": similarity_score  # similarity_score as float
+        })
+        
+        # Format similar questions for API response and database storage
+        similar_questions_list.append({
+            "question": matched_requirement,
+            "response": matched_response,
+            "reference": f"Response #{idx}",
+            "similarity_score": f"{similarity_score:.4f}"
+        })
+        
+    logger.info(f"Found {len(previous_responses)} similar questions")
+
+    result = {
+        "requirement_id": requirement_id,
+        "requirement": requirement["requirement"],
+        "category": requirement["category"],
+        "model": model,
+        "similar_questions": similar_questions_list
+    }
+
+    # The requirement embedding (pgvector text format, which is valid JSON) keys
+    # the in-process semantic cache
+    embedding = orjson.loads(requirement["embedding"]) if requirement.get("embedding") else None
+
+    reused_response = _reusable_response(requirement_id, requirement, similar_results, embedding, normalized_model)
+    if reused_response:
+        result.update({
+            "kind": "reuse",
+            "final_response": reused_response,
+            "model_provider": normalized_model
+        })
+
+    # Generate prompts based on model
+    elif model == 'moa':
+        logger.debug("3. Generating responses from all models")
+        logger.debug("Creating prompt with: requirement text (length %s), category: '%s', and %s similar responses", len(requirement["requirement"]), requirement["category"], len(previous_responses))
+        
+        # Debug - show the first previous response if available
+        if previous_responses and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("First previous response data sample:")
+            logger.debug("  Requirement: %s", previous_responses[0]['requirement'][:50])
+            logger.debug("  Response: %s", previous_responses[0]['response'][:50])
+            logger.debug("  Similarity: %s", previous_responses[0]['similarity_score'])
+
+        # Generate responses from all models
+        openai_prompt = create_rfp_prompt(requirement["requirement"], requirement["category"], previous_responses)
+        logger.debug("OpenAI prompt created - Contains %s message objects", len(openai_prompt))
+
+        # Get responses from all models concurrently
+        logger.debug("Generating responses from openai, deepseek and anthropic concurrently")
+        openai_response, deepseek_response, claude_response = await _gather_model_responses([
+            ('openai', prompt_gpt_async(openai_prompt, 'openai')),
+            ('deepseek', prompt_gpt_async(openai_prompt, 'deepseek')),
+            ('anthropic', _prompt_claude_async(openai_prompt))
+        ])
+
+        successful_responses = [r for r in (openai_response, deepseek_response, claude_response) if r]
+        if len(successful_responses) == 1:
+            # Nothing to synthesize, so skip the extra LLM call
+            logger.info("Only one model returned a response, using it without synthesis")
+            final_response = successful_responses[0]
+        # Create synthesized prompt
+        elif successful_responses:
+            responses_to_synthesize = "\n\n".join(
+                f"{label} Response:\n{response}"
+                for label, response in (("OpenAI", openai_response), ("Deepseek", deepseek_response), ("Claude", claude_response))
+                if response
+            )
+
+            synthesis_prompt = create_synthesized_response_prompt(requirement["requirement"], responses_to_synthesize)
+            try:
+                # Use openai for synthesis by default
+                logger.debug("Generating synthesized (MOA) response")
+                final_response = await asyncio.wait_for(prompt_gpt_async(synthesis_prompt, 'openai'), timeout=LLM_CALL_TIMEOUT)
+                logger.info(f"Successfully generated synthesized response of length: {len(final_response)}")
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    logger.error(f"Synthesized response timed out after {LLM_CALL_TIMEOUT} seconds")
                 else:
-                    raise ValueError("Failed to generate responses from any model")
-
-                # Save responses to database
-                print("4. Saving responses to database")
-                save_query = text("""
-                    UPDATE excel_requirement_responses
-                    SET 
-                        openai_response = :openai_response,
-                        deepseek_response = :deepseek_response,
-                        anthropic_response = :anthropic_response,
-                        final_response = :final_response,
-                        similar_questions = :similar_questions,
-                        model_provider = :model_provider,
-                        timestamp = NOW()
-                    WHERE id = :req_id
-                """)
-
-                connection.execute(save_query, {
-                    "req_id": requirement_id,
-                    "openai_response": openai_response,
-                    "deepseek_response": deepseek_response,
-                    "anthropic_response": claude_response,
-                    "final_response": final_response,
-                    "similar_questions": str(similar_questions_list),
-                    "model_provider": model
-                })
-                connection.commit()
-                print("5. Responses saved successfully")
+                    logger.error(f"Error generating synthesized response: {str(e)}")
+                # Fallback to the best available individual response
+                final_response = openai_response or deepseek_response or claude_response
+                logger.info(f"Using fallback response of length: {len(final_response) if final_response else 0}")
+        else:
+            raise ValueError("Failed to generate responses from any model")
 
-            else:
-                print(f"3. Generating response from {model}")
-                print("\n=== Single Model Prompt Creation Debug ===")
-                print(f"Creating prompt with: requirement text (length {len(requirement[1])}), category: '{requirement[2]}', and {len(previous_responses)} similar responses")
-                
-                # Debug - show the first previous response if available
-                if previous_responses:
-                    print(f"First previous response data sample:")
-                    print(f"  Requirement: {previous_responses[0]['requirement'][:50]}..." if len(previous_responses[0]['requirement']) > 50 else previous_responses[0]['requirement'])
-                    print(f"  Response: {previous_responses[0]['response'][:50]}..." if len(previous_responses[0]['response']) > 50 else previous_responses[0]['response'])
-                    print(f"  Similarity: {previous_responses[0]['similarity_score']}")
-                
-                # Generate prompt based on the model
-                try:
-                    # Get model config to check if it's Anthropic/Claude
-                    config = get_model_config(model)
-                    normalized_model = config['normalized_name']
-                    print(f"Model '{model}' normalized to '{normalized_model}'")
-                    
-                    # Claude/Anthropic uses a different prompt format
-                    if normalized_model == 'anthropic':
-                        print("Using Claude-specific prompt format")
-                        prompt = convert_prompt_to_claude(create_rfp_prompt(requirement[1], requirement[2], previous_responses))
-                    else:
-                        print(f"Using standard prompt format for {normalized_model}")
-                        prompt = create_rfp_prompt(requirement[1], requirement[2], previous_responses)
-                except ValueError:
-                    # Handle non-standard models (like 'moa')
-                    print(f"Model '{model}' not recognized, using standard prompt format")
-                    prompt = create_rfp_prompt(requirement[1], requirement[2], previous_responses)
-                
-                print(f"Prompt created - Contains {len(prompt)} message objects")
+        result.update({
+            "kind": "moa",
+            "openai_response": openai_response,
+            "deepseek_response": deepseek_response,
+            "anthropic_response": claude_response,
+            "final_response": final_response,
+            "model_provider": normalized_model
+        })
 
-                try:
-                    print(f"Calling LLM API for {model}...")
-                    response = prompt_gpt(prompt, model)
-                    print(f"LLM API call for {model} successful, response length: {len(response)} characters")
-                    # Print first 100 chars of the response for debugging
-                    print(f"Response preview: {response[:100]}...")
-                except Exception as e:
-                    print(f"ERROR: Failed to call LLM API for {model}")
-                    raise ValueError(f"Error generating response from {model}: {str(e)}")
+    else:
+        logger.debug("3. Generating response from %s", model)
+        logger.debug("Creating prompt with: requirement text (length %s), category: '%s', and %s similar responses", len(requirement["requirement"]), requirement["category"], len(previous_responses))
+        
+        # Debug - show the first previous response if available
+        if previous_responses and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("First previous response data sample:")
+            logger.debug("  Requirement: %s", previous_responses[0]['requirement'][:50])
+            logger.debug("  Response: %s", previous_responses[0]['response'][:50])
+            logger.debug("  Similarity: %s", previous_responses[0]['similarity_score'])
+        
+        # Generate prompt based on the model; Claude/Anthropic uses a different prompt format
+        if is_anthropic:
+            logger.debug("Using Claude-specific prompt format")
+            prompt = create_rfp_prompt_claude(requirement["requirement"], requirement["category"], previous_responses)
+        else:
+            logger.debug("Using standard prompt format for %s", normalized_model)
+            prompt = create_rfp_prompt(requirement["requirement"], requirement["category"], previous_responses)
+        
+        logger.debug("Prompt created - Contains %s message objects", len(prompt))
 
-                # Save response to database
-                print("4. Saving response to database")
-                
-                # Get the normalized model name using our config function
-                try:
-                    config = get_model_config(model)
-                    normalized_model = config['normalized_name']
-                except ValueError:
-                    # Fallback for 'moa' which doesn't have a specific config
-                    normalized_model = model.lower()
-                
-                print(f"Original model: '{model}', Normalized model: '{normalized_model}'")
-                
-                save_query = text("""
-                    UPDATE excel_requirement_responses
-                    SET 
-                        openai_response = CASE WHEN :normalized_model = 'openai' THEN :response ELSE openai_response END,
-                        deepseek_response = CASE WHEN :normalized_model = 'deepseek' THEN :response ELSE deepseek_response END,
-                        anthropic_response = CASE WHEN :normalized_model = 'anthropic' THEN :response ELSE anthropic_response END,
-                        final_response = :response,  -- Always set final_response to the current response
-                        similar_questions = :similar_questions,
-                        model_provider = :normalized_model,
-                        timestamp = NOW()
-                    WHERE id = :req_id
-                """)
-
-                print(f"Executing database update with model: {normalized_model}")
-                connection.execute(save_query, {
-                    "req_id": requirement_id,
-                    "response": response,
-                    "normalized_model": normalized_model,
-                    "similar_questions": str(similar_questions_list)
-                })
-                
-                # Log what was updated for debugging
-                print(f"Updated {normalized_model}_response column and final_response with response length: {len(response)}")
-                connection.commit()
-                print("5. Response saved successfully")
-
-            if display_results:
-                # Display results
-                print("\n=== Results ===")
-                print(f"Requirement: {requirement[1]}")
-                print(f"Category: {requirement[2]}")
-                print("\nSimilar Questions:")
-                for q in similar_questions_list:
-                    print(f"- {q['question']} (Similarity: {q['similarity_score']})")
-                print("\nFinal Response:")
-                print(final_response if model == 'moa' else response)
+        try:
+            logger.debug("Calling LLM API for %s", model)
+            response = await asyncio.wait_for(prompt_gpt_async(prompt, model), timeout=LLM_CALL_TIMEOUT)
+            logger.info(f"LLM API call for {model} successful, response length: {len(response)} characters")
+            # Log first 100 chars of the response for debugging
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response preview: %s...", response[:100])
+        except asyncio.TimeoutError:
+            logger.error(f"Failed to call LLM API for {model}")
+            raise ValueError(f"Error generating response from {model}: timed out after {LLM_CALL_TIMEOUT} seconds")
+        except Exception as e:
+            logger.error(f"Failed to call LLM API for {model}")
+            raise ValueError(f"Error generating response from {model}: {str(e)}")
+
+        result.update({
+            "kind": "single",
+            "final_response": response,
+            "model_provider": normalized_model
+        })
+
+    # Router decision with the top similarity, to tune the reuse thresholds
+    logger.info(
+        f"Routed requirement ID {requirement_id} to {result['kind']} "
+        f"(top similarity {similar_results[0][4] if similar_results else 0.0:.4f})"
+    )
+
+    if embedding and result["kind"] != "reuse":
+        semantic_cache.store(embedding, result["final_response"], requirement_id, normalized_model)
+
+    return result
+
+_SEMANTIC_CACHE_SET = """requirement_embedding = (
+                    SELECT embedding FROM embeddings
+                    WHERE requirement = excel_requirement_responses.requirement
+                    LIMIT 1
+                ),
+                generated_at = NOW(),"""
+
+_SEMANTIC_CACHE_CLEAR = """requirement_embedding = NULL,
+                generated_at = NULL,"""
+
+# Built once per process (per state of the semantic cache columns)
+@functools.lru_cache(maxsize=2)
+def _save_queries(semantic_cache_columns):
+    """
+    Build the UPDATE statements of save_llm_responses, one per result kind and,
+    for single-model results, one per provider.
+
+    Args:
+        semantic_cache_columns: Whether database.create_semantic_cache_columns has been run
+
+    Returns:
+        dict: Statement key -> TextClause
+    """
+    # Record the requirement embedding of generated responses for the semantic cache
+    semantic_cache_set = _SEMANTIC_CACHE_SET if semantic_cache_columns else ""
+    # A reused response was not generated for the row, so it stops being a cache entry
+    semantic_cache_clear = _SEMANTIC_CACHE_CLEAR if semantic_cache_columns else ""
+
+    save_queries = {
+        # Only the final response changes when a previous response is reused
+        "reuse": text(f"""
+            UPDATE excel_requirement_responses
+            SET 
+                final_response = :final_response,
+                similar_questions = :similar_questions,
+                model_provider = :model_provider,
+                {semantic_cache_clear}
+                timestamp = NOW()
+            WHERE id = :req_id
+        """),
+        "moa": text(f"""
+            UPDATE excel_requirement_responses
+            SET 
+                openai_response = :openai_response,
+                deepseek_response = :deepseek_response,
+                anthropic_response = :anthropic_response,
+                final_response = :final_response,
+                similar_questions = :similar_questions,
+                model_provider = :model_provider,
+                {semantic_cache_set}
+                timestamp = NOW()
+            WHERE id = :req_id
+        """),
+    }
+    # Single-model results only set their own provider's column
+    for provider in ('openai', 'deepseek', 'anthropic'):
+        save_queries[provider] = text(f"""
+            UPDATE excel_requirement_responses
+            SET 
+                {provider}_response = :final_response,
+                final_response = :final_response,  -- Always set final_response to the current response
+                similar_questions = :similar_questions,
+                model_provider = :model_provider,
+                {semantic_cache_set}
+                timestamp = NOW()
+            WHERE id = :req_id
+        """)
+    return save_queries
+
+def save_llm_responses(results, connection=None):
+    """
+    Save generation results to the database, one executemany per statement type.
+
+    Results are written in chunks of SAVE_BATCH_SIZE, each in its own transaction,
+    unless the connection is already in a transaction: the whole save is then part
+    of it and committing is left to the caller.
+
+    Args:
+        results: List of results from get_llm_responses_async
+        connection: Database connection to use (optional; one is checked out of the pool otherwise)
+    """
+    save_queries = _save_queries(has_semantic_cache_columns())
+    with connection_scope(connection) as connection:
+        for start in range(0, len(results), SAVE_BATCH_SIZE):
+            _save_result_batch(save_queries, results[start:start + SAVE_BATCH_SIZE], connection)
+
+def _save_result_batch(save_queries, results, connection):
+    """
+    Write one chunk of results in a single transaction.
+
+    Args:
+        save_queries: UPDATE statement per result kind (per provider for single-model results)
+        results: Results to save
+        connection: Database connection to use
+    """
+    params_by_statement = {}
+    for result in results:
+        params = {
+            "req_id": result["requirement_id"],
+            "final_response": result["final_response"],
+            "similar_questions": orjson.dumps(result["similar_questions"]).decode(),
+            "model_provider": result["model_provider"]
+        }
+        if result["kind"] == "moa":
+            params.update({
+                "openai_response": result["openai_response"],
+                "deepseek_response": result["deepseek_response"],
+                "anthropic_response": result["anthropic_response"]
+            })
+        # Single-model results use the UPDATE of their provider
+        statement = result["model_provider"] if result["kind"] == "single" else result["kind"]
+        params_by_statement.setdefault(statement, []).append(params)
+
+    if not params_by_statement:
+        return
+
+    logger.debug("4. Saving %s responses to database", len(results))
+    # One transaction for the chunk, unless the writes are part of the caller's
+    # transaction: that one commits (or rolls back) once for all of them
+    own_transaction = not connection.in_transaction()
+    try:
+        for statement, params in params_by_statement.items():
+            connection.execute(save_queries[statement], params)
+        if own_transaction:
+            connection.commit()
+    except Exception:
+        # Leave the connection usable for the caller's next chunk
+        if own_transaction:
+            connection.rollback()
+        raise
+    logger.debug("5. Responses saved successfully")
+
+def _display_results(result):
+    """Print a generation result for command-line use."""
+    print("\n=== Results ===")
+    print(f"Requirement: {result['requirement']}")
+    print(f"Category: {result['category']}")
+    print("\nSimilar Questions:")
+    for q in result['similar_questions']:
+        print(f"- {q['question']} (Similarity: {q['similarity_score']})")
+    print("\nFinal Response:")
+    print(result['final_response'])
+
+def get_llm_responses(requirement_id, model='moa', display_results=True, skip_similarity_search=False, connection=None):
+    """
+    Get LLM responses for a given requirement and save them to the database.
+
+    To save several requirements with a single commit, pass a connection in a
+    transaction (e.g. from ``engine.begin()``); the result is then saved as part
+    of it.
+
+    Args:
+        requirement_id: ID of the requirement to process
+        model: Model to use ('openAI', 'deepseek', 'anthropic'/'claude', or 'moa')
+               If 'moa', responses from all models will be synthesized
+        display_results: Whether to display the results after fetching
+        skip_similarity_search: If True, skips finding similar matches and uses existing ones in the database
+        connection: Database connection to use (optional; one is checked out of the pool otherwise)
+    """
+    logger.info(f"Processing requirement ID: {requirement_id} with model: {model}")
+    try:
+        # One connection for loading the requirement and saving its result
+        with connection_scope(connection) as connection:
+            result = _run_async(get_llm_responses_async(requirement_id, model, skip_similarity_search, connection=connection))
+            save_llm_responses([result], connection)
+        semantic_cache.save()
+
+        if display_results:
+            _display_results(result)
 
     except Exception as e:
-        print(f"\nError in get_llm_responses: {str(e)}")
+        logger.error(f"Error in get_llm_responses: {str(e)}")
         raise
 
+async def get_llm_responses_batch_async(requirement_ids, model='moa', skip_similarity_search=False):
+    """
+    Generate LLM responses for several requirements concurrently and save them.
+
+    At most BATCH_CONCURRENCY requirements are processed at once; provider calls
+    are additionally capped by the per-provider rate limiters.
+
+    Args:
+        requirement_ids: IDs of the requirements to process
+        model: Model to use ('openAI', 'deepseek', 'anthropic'/'claude', or 'moa')
+        skip_similarity_search: If True, skips finding similar matches and uses existing ones in the database
+
+    Returns:
+        list: One result dict per requirement, or the exception raised for it
+    """
+    # One connection from the pool for the whole batch; the LLM workers never touch
+    # the database, and the lock keeps the flushes from using it concurrently
+    connection = await asyncio.to_thread(engine.connect)
+    connection_lock = asyncio.Lock()
+    try:
+        return await _process_batch(requirement_ids, model, skip_similarity_search, connection, connection_lock)
+    finally:
+        await asyncio.to_thread(connection.close)
+
+async def _process_batch(requirement_ids, model, skip_similarity_search, connection, connection_lock):
+    """Load, generate and save a batch of requirements on one database connection."""
+    # Load every requirement and its similar matches in one query up front
+    loaded = await asyncio.to_thread(_load_requirements, requirement_ids, _normalized_model_name(model), skip_similarity_search, connection)
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    pending = []
+    # id() of each result whose save failed -> the exception raised saving it
+    save_errors = {}
+
+    async def flush():
+        # Save the pending results with one executemany per statement type
+        batch = pending[:]
+        pending.clear()
+        if not batch:
+            return
+        try:
+            async with connection_lock:
+                await asyncio.to_thread(save_llm_responses, batch, connection)
+        except Exception as e:
+            logger.error(f"Error saving responses for requirement IDs {[r['requirement_id'] for r in batch]}: {str(e)}")
+            save_errors.update((id(r), e) for r in batch)
+
+    async def process_one(requirement_id):
+        if requirement_id not in loaded:
+            raise ValueError(f"No requirement found with ID: {requirement_id}")
+        async with semaphore:
+            result = await get_llm_responses_async(requirement_id, model, skip_similarity_search, loaded[requirement_id])
+        pending.append(result)
+        if len(pending) >= SAVE_BATCH_SIZE:
+            await flush()
+        return result
+
+    results = await asyncio.gather(*(process_one(r) for r in requirement_ids), return_exceptions=True)
+    await flush()
+    await asyncio.to_thread(semantic_cache.save)
+
+    for requirement_id, result in zip(requirement_ids, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Error generating response for requirement ID {requirement_id}: {str(result)}")
+
+    # A result that was never saved is reported as the error that lost it
+    return [save_errors.get(id(result), result) for result in results]
+
+def get_llm_responses_batch(requirement_ids, model='moa', skip_similarity_search=False):
+    """
+    Get LLM responses for several requirements and save them to the database.
+
+    Args:
+        requirement_ids: IDs of the requirements to process
+        model: Model to use ('openAI', 'deepseek', 'anthropic'/'claude', or 'moa')
+        skip_similarity_search: If True, skips finding similar matches and uses existing ones in the database
+
+    Returns:
+        list: One result dict per requirement, or the exception raised for it
+    """
+    logger.info(f"Processing {len(requirement_ids)} requirements with model: {model}")
+    return _run_async(get_llm_responses_batch_async(requirement_ids, model, skip_similarity_search))
+
 if __name__ == "__main__":
     # Example usage with model selection
     import sys
 
-    # Get requirement ID and model from command line arguments
-    requirement_id = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    # Get requirement ID(s) and model from command line arguments; a comma-separated
+    # list of IDs is processed as a batch
+    requirement_ids = [int(r) for r in sys.argv[1].split(',')] if len(sys.argv) > 1 else [1]
     model = sys.argv[2] if len(sys.argv) > 2 else 'moa'
     display_results = len(sys.argv) <= 3 or sys.argv[3].lower() != 'false'
     # Default to not skipping similarity search
     skip_similarity_search = len(sys.argv) > 4 and sys.argv[4].lower() == 'true'
 
-    get_llm_responses(requirement_id, model, display_results, skip_similarity_search)
\ No newline at end of file
+    if len(requirement_ids) == 1:
+        get_llm_responses(requirement_ids[0], model, display_results, skip_similarity_search)
+    else:
+        for batch_result in get_llm_responses_batch(requirement_ids, model, skip_similarity_search):
+            if display_results and not isinstance(batch_result, BaseException):
+                _display_results(batch_result)
@@ -1,6 +1,9 @@
 import os
+import sys
 import logging
-from sqlalchemy import create_engine
+import contextlib
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.sql import text
 
 # Configure logging
@@ -15,12 +18,111 @@ if not database_url:
 
 # Create the SQLAlchemy engine
 try:
-    engine = create_engine(database_url)
+    engine_options = {
+        # Long-lived pool shared by every call in the process; pre-ping replaces
+        # connections the server dropped, recycle retires them before idle timeouts
+        "pool_size": int(os.environ.get('DB_POOL_SIZE', 8)),
+        "max_overflow": int(os.environ.get('DB_MAX_OVERFLOW', 16)),
+        "pool_pre_ping": True,
+        "pool_recycle": int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    }
+    if make_url(database_url).get_driver_name() == "psycopg2":
+        # Send executemany UPDATEs as batched pages instead of one round-trip per row
+        engine_options["executemany_mode"] = "values_plus_batch"
+    engine = create_engine(database_url, **engine_options)
     logger.info("Database engine created successfully")
 except Exception as e:
     logger.error(f"Error creating database engine: {str(e)}")
     raise
 
+# Search breadth of the HNSW index on embeddings.embedding (higher = better recall, slower)
+hnsw_ef_search = int(os.environ.get('HNSW_EF_SEARCH', 40))
+
+@event.listens_for(engine, "connect")
+def set_session_parameters(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"SET hnsw.ef_search = {hnsw_ef_search}")
+    cursor.close()
+    # SET is transactional, so commit it before the pool hands out the connection
+    dbapi_connection.commit()
+
+# Use the caller's connection when one is given, otherwise check one out of the pool for the block
+@contextlib.contextmanager
+def connection_scope(connection=None):
+    if connection is not None:
+        yield connection
+        return
+    with engine.connect() as connection:
+        yield connection
+
+# Create the approximate nearest-neighbour index used by the similarity searches
+def create_vector_index():
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("""
+                CREATE INDEX IF NOT EXISTS embeddings_emb_hnsw
+                ON embeddings USING hnsw (embedding vector_cosine_ops)
+                WITH (m = 16, ef_construction = 64)
+            """))
+        logger.info("HNSW index on embeddings.embedding is in place")
+        return True
+    except Exception as e:
+        logger.error(f"Error creating vector index: {str(e)}")
+        return False
+
+# Add the columns and index used by the semantic response cache in call_llm.py:
+# the embedding of each requirement with a generated response, and when it was generated
+def create_semantic_cache_columns():
+    global _semantic_cache_columns
+    try:
+        with engine.begin() as connection:
+            # Match the dimensions of the stored embeddings (the HNSW index needs a fixed size)
+            dimensions = connection.execute(text(
+                "SELECT vector_dims(embedding) FROM embeddings WHERE embedding IS NOT NULL LIMIT 1"
+            )).scalar()
+            if not dimensions:
+                logger.error("No embeddings found; cannot determine the embedding dimensions")
+                return False
+            connection.execute(text(f"""
+                ALTER TABLE excel_requirement_responses
+                ADD COLUMN IF NOT EXISTS requirement_embedding vector({int(dimensions)}),
+                ADD COLUMN IF NOT EXISTS generated_at TIMESTAMP
+            """))
+            connection.execute(text("""
+                CREATE INDEX IF NOT EXISTS excel_requirement_responses_emb_hnsw
+                ON excel_requirement_responses USING hnsw (requirement_embedding vector_cosine_ops)
+                WITH (m = 16, ef_construction = 64)
+            """))
+        _semantic_cache_columns = True
+        logger.info("Semantic cache columns on excel_requirement_responses are in place")
+        return True
+    except Exception as e:
+        logger.error(f"Error creating semantic cache columns: {str(e)}")
+        return False
+
+# Result of the last successful has_semantic_cache_columns check (None until then)
+_semantic_cache_columns = None
+
+# Whether create_semantic_cache_columns has been run on this database (checked once
+# per process; a failed check is retried on the next call)
+def has_semantic_cache_columns():
+    global _semantic_cache_columns
+    if _semantic_cache_columns is not None:
+        return _semantic_cache_columns
+    try:
+        with engine.connect() as connection:
+            count = connection.execute(text("""
+                SELECT COUNT(*)
+                FROM information_schema.columns
+                WHERE table_name = 'excel_requirement_responses'
+                  AND column_name IN ('requirement_embedding', 'generated_at')
+            """)).scalar()
+        _semantic_cache_columns = count == 2
+        return _semantic_cache_columns
+    except Exception as e:
+        logger.error(f"Error checking semantic cache columns: {str(e)}")
+        return False
+
 # Test the connection
 def test_connection():
     try:
@@ -36,6 +138,9 @@ def test_connection():
         logger.error(f"Error testing database connection: {str(e)}")
         return False
 
-# If this file is run directly, test the connection
+# If this file is run directly, test the connection (and optionally create the indexes)
 if __name__ == "__main__":
-    test_connection()
\ No newline at end of file
+    test_connection()
+    if len(sys.argv) > 1 and sys.argv[1] == "create-indexes":
+        create_vector_index()
+        create_semantic_cache_columns()
\ No newline at end of file
@@ -2,7 +2,8 @@ import json
 import logging
 import sys
 import time
-from database import engine
+import orjson
+from database import connection_scope
 from sqlalchemy import text
 
 # Configure more detailed logging
@@ -15,29 +16,75 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def find_similar_matches(requirement_id):
+# Statements used by find_similar_matches, built once at import
+_REQUIREMENT_QUERY = text("""
+    SELECT r.id, r.requirement, r.category
+    FROM excel_requirement_responses r
+    WHERE r.id = :req_id
+""")
+
+_EMBEDDING_COUNT_QUERY = text("""
+    SELECT COUNT(*) 
+    FROM embeddings 
+    WHERE requirement = (
+        SELECT requirement 
+        FROM excel_requirement_responses 
+        WHERE id = :req_id
+    )
+""")
+
+# Find top 5 similar vectors using cosine similarity with a more efficient query
+# Using Common Table Expression (CTE) to avoid nested subqueries; ordering by the
+# raw distance lets the HNSW index on embeddings.embedding serve the query
+_SIMILAR_QUERY = text("""
+    WITH req_embedding AS (
+        SELECT embedding
+        FROM embeddings
+        WHERE requirement = (
+            SELECT requirement
+            FROM excel_requirement_responses
+            WHERE id = :req_id
+        )
+        LIMIT 1
+    )
+    SELECT 
+        e.id,
+        e.requirement as matched_requirement,
+        e.response as matched_response,
+        e.category,
+        1 - (e.embedding <=> (SELECT embedding FROM req_embedding)) as similarity_score
+    FROM embeddings e
+    WHERE e.embedding IS NOT NULL
+    ORDER BY e.embedding <=> (SELECT embedding FROM req_embedding)
+    LIMIT 5;
+""")
+
+_UPDATE_SIMILAR_QUESTIONS_QUERY = text("""
+    UPDATE excel_requirement_responses
+    SET similar_questions = :similar_questions
+    WHERE id = :req_id
+""")
+
+def find_similar_matches(requirement_id, connection=None):
     """
     Find similar matches for a requirement using vector similarity search.
     Also stores the similar matches in the similar_questions column of excel_requirement_responses.
     
     Args:
         requirement_id: The ID of the requirement to find matches for
+        connection: Database connection to use (optional; one is checked out of the pool otherwise).
+            If it is already in a transaction, committing is left to the caller
         
     Returns:
         Dict with requirement details and similar matches
     """
     logger.info(f"Finding similar matches for requirement ID: {requirement_id}")
     try:
-        with engine.connect() as connection:
-            # First, get the requirement details
-            req_query = text("""
-                SELECT r.id, r.requirement, r.category
-                FROM excel_requirement_responses r
-                WHERE r.id = :req_id
-            """)
+        with connection_scope(connection) as connection:
+            own_transaction = not connection.in_transaction()
 
             # Get the requirement details
-            requirement = connection.execute(req_query, {"req_id": requirement_id}).fetchone()
+            requirement = connection.execute(_REQUIREMENT_QUERY, {"req_id": requirement_id}).fetchone()
 
             if not requirement:
                 print(f"\nNo requirement found with ID: {requirement_id}")
@@ -50,17 +97,7 @@ def find_similar_matches(requirement_id):
             logger.info(f"Found requirement: {requirement}")
             
             # First check if an embedding exists for this requirement
-            embedding_check_query = text("""
-                SELECT COUNT(*) 
-                FROM embeddings 
-                WHERE requirement = (
-                    SELECT requirement 
-                    FROM excel_requirement_responses 
-                    WHERE id = :req_id
-                )
-            """)
-            
-            embedding_count = connection.execute(embedding_check_query, {"req_id": requirement_id}).scalar()
+            embedding_count = connection.execute(_EMBEDDING_COUNT_QUERY, {"req_id": requirement_id}).scalar()
             logger.info(f"Found {embedding_count} embeddings for requirement ID {requirement_id}")
             
             if embedding_count == 0:
@@ -77,31 +114,6 @@ def find_similar_matches(requirement_id):
                     "warning": "No embeddings found for this requirement"
                 }
             
-            # Find top 5 similar vectors using cosine similarity with a more efficient query
-            # Using Common Table Expression (CTE) to avoid nested subqueries
-            similar_query = text("""
-                WITH req_embedding AS (
-                    SELECT embedding
-                    FROM embeddings
-                    WHERE requirement = (
-                        SELECT requirement
-                        FROM excel_requirement_responses
-                        WHERE id = :req_id
-                    )
-                    LIMIT 1
-                )
-                SELECT 
-                    e.id,
-                    e.requirement as matched_requirement,
-                    e.response as matched_response,
-                    e.category,
-                    1 - (e.embedding <=> (SELECT embedding FROM req_embedding)) as similarity_score
-                FROM embeddings e
-                WHERE e.embedding IS NOT NULL
-                ORDER BY similarity_score DESC
-                LIMIT 5;
-            """)
-
             # Log that we're starting the similarity search
             logger.info(f"Starting similarity search query for requirement ID: {requirement_id}")
             start_time = time.time()
@@ -110,7 +122,7 @@ def find_similar_matches(requirement_id):
             # Using try/except to catch potential timeout issues
             try:
                 similar_results = connection.execution_options(timeout=20).execute(
-                    similar_query, {"req_id": requirement_id}
+                    _SIMILAR_QUERY, {"req_id": requirement_id}
                 ).fetchall()
                 
                 elapsed_time = time.time() - start_time
@@ -145,22 +157,17 @@ def find_similar_matches(requirement_id):
             # Store the similar questions in the database
             if similar_questions_for_db:
                 # Convert to JSON string for storage
-                similar_questions_json = json.dumps(similar_questions_for_db)
+                similar_questions_json = orjson.dumps(similar_questions_for_db).decode()
                 
                 # Update the similar_questions column in the database
-                update_query = text("""
-                    UPDATE excel_requirement_responses
-                    SET similar_questions = :similar_questions
-                    WHERE id = :req_id
-                """)
-                
-                connection.execute(update_query, {
+                connection.execute(_UPDATE_SIMILAR_QUESTIONS_QUERY, {
                     "req_id": requirement_id,
                     "similar_questions": similar_questions_json
                 })
                 
-                # Commit the transaction
-                connection.commit()
+                # Commit the transaction, unless it is the caller's
+                if own_transaction:
+                    connection.commit()
                 logger.info(f"Updated similar_questions in database for requirement ID: {requirement_id}")
             
             # For debug/console output in logs only
@@ -1,14 +1,76 @@
 """
 Prompt generation utilities for RFP response generation
 """
-import json
+import functools
 import logging
 from typing import Dict, List, Any, Optional, Union
+from sqlalchemy import text
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Library module: leave the logging configuration to the application
 logger = logging.getLogger(__name__)
 
+# Static prompt templates, filled in with str.format_map for each requirement
+_SYSTEM_TEMPLATE = """You are a senior RFP specialist with over 15 years of experience in wealth management software, writing precise, business-aligned responses to RFP requirements.
+
+**CONTEXT**:
+- Requirement Category: {category}.
+- Current Requirement: {requirement}.
+- Audience: Business professionals and wealth management decision-makers.
+
+**GUIDELINES**:
+1. **Content**: Use the previous responses as source material, prioritizing those with higher similarity scores. Include technical details only when needed to demonstrate capability. Keep the response under 350 words; aim for 250.
+2. **Style**: Professional, clear and concise, avoiding excessive technical jargon. Focus on business benefits and value propositions; the response must be complete and submission-ready.
+3. **Structure**: Open with the most relevant capability, support it with specific examples or benefits, and end with a tailored statement of value.
+4. **Constraints**: No meta-text or commentary (e.g., "Here's the response…", 'Draft Response'), no speculative or ambiguous language, and no letter format (salutation or signature).
+
+**FINAL CHECK**: Before answering, make sure the response is relevant to the requirement and business-focused, free of meta-text, assumptions and salutations, and ends with a clear, specific value proposition. Revise it if any of these fail.
+"""
+
+_USER_TEMPLATE = """**Previous Responses and Scores**:
+{examples}
+
+**Current Requirement**: {requirement}
+"""
+
+_NO_EXAMPLES_TEXT = "No previous responses available. Create an original response based on your expertise."
+
+# Previous responses are cut to this many characters in the prompt examples
+_EXAMPLE_RESPONSE_MAX_CHARS = 800
+
+# Message roles kept by convert_prompt_to_claude
+_CLAUDE_ROLES = frozenset(('user', 'assistant'))
+
+# Requirement lookup of find_similar_matches_and_generate_prompt, built once at import
+_REQUIREMENT_QUERY = text("""
+    SELECT id, requirement, category 
+    FROM excel_requirement_responses 
+    WHERE id = :req_id
+""")
+
+@functools.lru_cache(maxsize=1024)
+def _system_content(requirement: str, category: Optional[str]) -> str:
+    """Render the system message; the same requirement and category recur across models and retries."""
+    return _SYSTEM_TEMPLATE.format_map({
+        "category": category or 'Financial Technology',
+        "requirement": requirement
+    })
+
+def _format_example(index: int, resp: Dict[str, Any]) -> str:
+    """Format one previous response as a prompt example; similarity_score is a float from the loaders."""
+    score = float(resp.get('similarity_score', 0.0))
+    response = (resp.get('response') or '')[:_EXAMPLE_RESPONSE_MAX_CHARS].rstrip()
+    return f"**Example {index} (Similarity: {score:.2f})**:\nRequirement: {resp.get('requirement', '')}\nResponse: {response}\n\n"
+
+def _user_content(requirement: str, previous_responses: Optional[List[Dict[str, Any]]]) -> str:
+    """Render the user message: up to 3 previous responses as examples, then the requirement."""
+    formatted_examples = "".join(
+        _format_example(i, resp) for i, resp in enumerate((previous_responses or [])[:3], 1)
+    )
+    return _USER_TEMPLATE.format_map({
+        "examples": formatted_examples or _NO_EXAMPLES_TEXT,
+        "requirement": requirement
+    })
+
 def create_rfp_prompt(requirement: str, category: Optional[str] = None, previous_responses: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
     """
     Create an optimized prompt for RFP response generation.
@@ -21,111 +83,56 @@ def create_rfp_prompt(requirement: str, category: Optional[str] = None, previous
     Returns:
         List of message dictionaries for LLM.
     """
-    logger.info(f"Creating prompt for requirement: {requirement}")
-    logger.info(f"Category: {category}")
-    logger.info(f"Previous responses available: {len(previous_responses or [])} items")
+    logger.debug("Creating prompt for requirement: %s", requirement)
+    logger.debug("Category: %s", category)
+    logger.debug("Previous responses available: %s items", len(previous_responses or []))
     
     # Create the system message with detailed instructions
     system_message = {
         "role": "system",
-        "content": f"""You are a senior RFP specialist with over 15 years of experience in wealth management software.
-Your expertise lies in crafting precise, impactful, and business-aligned responses to RFP requirements.
-
-**CONTEXT**:
-- Domain: Wealth Management Software.
-- Requirement Category: {category or 'Financial Technology'}.
-- Current Requirement: {requirement}.
-- Audience: Business professionals and wealth management decision-makers.
-
-**TASK**:
-Develop a high-quality response to the current RFP requirement. Use the provided previous responses as source material, prioritizing content from responses with higher similarity scores.
-
-**GUIDELINES**:
-1. **Response Style**:
-   - Professional, clear, and concise.
-   - Accessible to business professionals, avoiding excessive technical jargon.
-   - Focus on business benefits, practical applications, and value propositions.
-   - Ensure the response is complete and submission-ready.
-
-2. **Content Rules**:
-   - Incorporate content from the provided previous responses where relevant.
-   - Prioritize responses with higher similarity scores for relevance.
-   - Include technical details only when needed to demonstrate capability.
-   - Maintain an appropriate length (200-400 words) based on the complexity of the requirement.
-
-3. **Response Structure**:
-   - **Opening Statement**: Highlight the most relevant feature or capability related to the requirement.
-   - **Supporting Information**: Include specific examples or benefits that reinforce the feature.
-   - **Value Proposition**: End with a strong, tailored statement of value.
-
-4. **Critical Constraints**:
-   - Do NOT include any meta-text or commentary (e.g., "Here's the response…", 'Draft Response').
-   - Do NOT include speculative or ambiguous language.
-   - Format your response as direct informational content, not as a letter with salutation and signature.
-"""
+        "content": _system_content(requirement, category)
     }
     
-    # Format the previous responses for the prompt
-    formatted_examples = ""
-    if previous_responses and len(previous_responses) > 0:
-        for i, resp in enumerate(previous_responses[:3], 1):  # Use up to 3 similar responses
-            score = resp.get('similarity_score', 0)
-            if isinstance(score, str):
-                try:
-                    score = float(score)
-                except:
-                    score = 0
-                    
-            formatted_examples += f"**Example {i} (Similarity: {score:.2f})**:\n"
-            formatted_examples += f"Requirement: {resp.get('requirement', '')}\n"
-            formatted_examples += f"Response: {resp.get('response', '')}\n\n"
-    
     # Create user message with requirement and examples
     user_message = {
         "role": "user",
-        "content": f"""You have the following previous responses with similarity scores to evaluate:
-
-**Previous Responses and Scores**:
-{formatted_examples or "No previous responses available. Create an original response based on your expertise."}
-
-**Instructions**:
-1. Analyze the responses, prioritizing those with higher scores for relevance.
-2. Draft a response that meets all guidelines and rules outlined in the system message.
-3. Ensure the response is clear, concise, and tailored to the given requirement.
-
-**Current Requirement**: {requirement}
-"""
-    }
-    
-    # Add validation message as a final check
-    validation_message = {
-        "role": "user",
-        "content": """Review and validate the draft response based on these criteria:
-1. Content is appropriate and relevant to the requirement.
-2. The tone is professional and business-focused.
-3. No meta-text, assumptions, or speculative language is present.
-4. No salutation like "Dear [Client's Name]" or signature block is included.
-5. The response delivers a clear, specific value proposition for the requirement.
-
-If any criteria are unmet, revise the response accordingly."""
+        "content": _user_content(requirement, previous_responses)
     }
     
-    # Create the full message array
-    messages = [system_message, user_message, validation_message]
+    # Create the full message array; the final validation checks are part of the system message
+    messages = [system_message, user_message]
     
-    # Print the full prompt for debugging
-    prompt_preview = f"""
-======== GENERATED PROMPT ========
-SYSTEM: {system_message['content'][:200]}...
-USER: {user_message['content'][:200]}...
-VALIDATION: {validation_message['content'][:200]}...
-================================
-"""
-    print(prompt_preview)
-    logger.info(prompt_preview)
+    # Log a preview of the prompt for debugging; the slices are only built when it is shown
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Generated prompt:\nSYSTEM: %s...\nUSER: %s...",
+            system_message['content'][:200],
+            user_message['content'][:200]
+        )
     
     return messages
 
+def create_rfp_prompt_claude(requirement: str, category: Optional[str] = None, previous_responses: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Create the RFP prompt directly in Claude format.
+
+    Equivalent to convert_prompt_to_claude(create_rfp_prompt(...)) without building
+    and converting the standard prompt first.
+
+    Args:
+        requirement: The current RFP requirement to address.
+        category: Functional category of the requirement (optional).
+        previous_responses: List of previous responses with their similarity scores (optional).
+
+    Returns:
+        List of message dictionaries in Claude format.
+    """
+    logger.debug("Creating Claude prompt for requirement: %s", requirement)
+    return [{
+        "role": "user",
+        "content": f"{_system_content(requirement, category)}\n\nHuman: {_user_content(requirement, previous_responses)}"
+    }]
+
 def convert_prompt_to_claude(prompt: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Convert a standard prompt format to Claude-compatible format.
@@ -136,48 +143,23 @@ def convert_prompt_to_claude(prompt: List[Dict[str, Any]]) -> List[Dict[str, Any
     Returns:
         List of message dictionaries in Claude format.
     """
-    claude_messages = []
-    system_message = ""
-
-    # Extract system message if present
-    for msg in prompt:
-        if msg['role'] == 'system':
-            system_message = msg['content']
-            break
-
-    # Convert messages
-    for msg in prompt:
-        if msg['role'] == 'system':
-            continue  # Skip system messages as they're handled differently
-
-        if msg['role'] == 'assistant':
-            claude_messages.append({
-                'role': 'assistant',
-                'content': msg['content']
-            })
-        elif msg['role'] == 'user':
-            # If there's a system message and this is the first user message,
-            # prepend it to the content
-            if system_message and not claude_messages:
-                content = f"{system_message}\n\nHuman: {msg['content']}"
-                claude_messages.append({
-                    'role': 'user',
-                    'content': content
-                })
-            else:
-                claude_messages.append({
-                    'role': 'user',
-                    'content': msg['content']
-                })
+    # Claude takes no system role here: the first system message is prepended to the first user message
+    system_message = next((msg['content'] for msg in prompt if msg['role'] == 'system'), "")
+    # The messages are passed through as-is; only a modified first message is copied
+    claude_messages = [msg for msg in prompt if msg['role'] in _CLAUDE_ROLES]
+
+    if system_message and claude_messages and claude_messages[0]['role'] == 'user':
+        claude_messages[0] = {'role': 'user', 'content': f"{system_message}\n\nHuman: {claude_messages[0]['content']}"}
 
     return claude_messages
 
-def find_similar_matches_and_generate_prompt(requirement_id: int) -> List[Dict[str, Any]]:
+def find_similar_matches_and_generate_prompt(requirement_id: int, connection=None) -> List[Dict[str, Any]]:
     """
     Find similar matches for a requirement and use them to generate a prompt.
 
     Args:
         requirement_id: ID of the requirement to find matches for
+        connection: Database connection to use (optional; one is checked out of the pool otherwise)
 
     Returns:
         List of message dictionaries for the LLM
@@ -185,24 +167,18 @@ def find_similar_matches_and_generate_prompt(requirement_id: int) -> List[Dict[s
     try:
         # Import here to avoid circular imports
         from find_matches import find_similar_matches
-        from database import engine
-        from sqlalchemy import text
+        from database import connection_scope
         
-        # Get the requirement details
-        with engine.connect() as connection:
-            req_query = text("""
-                SELECT id, requirement, category 
-                FROM excel_requirement_responses 
-                WHERE id = :req_id
-            """)
-            requirement = connection.execute(req_query, {"req_id": requirement_id}).fetchone()
+        # One connection for the requirement lookup and the similarity search
+        with connection_scope(connection) as connection:
+            requirement = connection.execute(_REQUIREMENT_QUERY, {"req_id": requirement_id}).fetchone()
             
             if not requirement:
                 logger.error(f"No requirement found with ID: {requirement_id}")
                 return create_rfp_prompt(f"Missing requirement with ID {requirement_id}")
         
-        # Find similar matches
-        matches_result = find_similar_matches(requirement_id)
+            # Find similar matches
+            matches_result = find_similar_matches(requirement_id, connection)
         
         if not matches_result.get("success", False):
             logger.error(f"Error finding similar matches: {matches_result.get('error', 'Unknown error')}")
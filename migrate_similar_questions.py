@@ -0,0 +1,107 @@
+"""
+One-time migration of excel_requirement_responses.similar_questions to JSON.
+
+Older versions of call_llm.py stored the similar questions as the Python repr of a
+list of dicts (single quotes, None/True literals), which only ast.literal_eval could
+read back. This script rewrites those rows as JSON so every reader can use a JSON
+parser.
+
+With --jsonb it also changes the column type from TEXT to JSONB afterwards, so
+the similar questions can be queried (and indexed) directly in SQL.
+"""
+import ast
+import json
+import logging
+import sys
+import orjson
+from database import engine
+from sqlalchemy import text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_similar_questions():
+    """
+    Convert Python-repr similar_questions values to JSON.
+
+    Returns:
+        Dict with the number of converted, skipped and failed rows
+    """
+    # The ::text casts keep the query working once the column is JSONB
+    select_query = text("""
+        SELECT id, similar_questions::text
+        FROM excel_requirement_responses
+        WHERE similar_questions IS NOT NULL AND similar_questions::text <> ''
+    """)
+    update_query = text("""
+        UPDATE excel_requirement_responses
+        SET similar_questions = :similar_questions
+        WHERE id = :req_id
+    """)
+
+    converted = []
+    skipped = 0
+    failed = 0
+    with engine.connect() as connection:
+        for req_id, similar_questions in connection.execute(select_query).fetchall():
+            try:
+                orjson.loads(similar_questions)
+                skipped += 1
+                continue
+            except ValueError:
+                pass
+
+            try:
+                converted.append({
+                    "req_id": req_id,
+                    "similar_questions": orjson.dumps(ast.literal_eval(similar_questions)).decode()
+                })
+            except (ValueError, SyntaxError) as e:
+                logger.error(f"Could not convert similar_questions for requirement ID {req_id}: {str(e)}")
+                failed += 1
+
+        if converted:
+            connection.execute(update_query, converted)
+            connection.commit()
+
+    logger.info(f"Converted {len(converted)} rows, {skipped} already JSON, {failed} failed")
+    return {"converted": len(converted), "skipped": skipped, "failed": failed}
+
+def convert_column_to_jsonb():
+    """
+    Change the type of similar_questions from TEXT to JSONB.
+
+    Every value must already be JSON (run migrate_similar_questions first); empty
+    strings become NULL.
+
+    Returns:
+        bool: True if the column is JSONB afterwards
+    """
+    with engine.begin() as connection:
+        data_type = connection.execute(text("""
+            SELECT data_type
+            FROM information_schema.columns
+            WHERE table_name = 'excel_requirement_responses' AND column_name = 'similar_questions'
+        """)).scalar()
+        if data_type == "jsonb":
+            logger.info("similar_questions is already JSONB")
+            return True
+        connection.execute(text("""
+            ALTER TABLE excel_requirement_responses
+            ALTER COLUMN similar_questions TYPE jsonb
+            USING NULLIF(similar_questions, '')::jsonb
+        """))
+    logger.info("Changed similar_questions to JSONB")
+    return True
+
+if __name__ == "__main__":
+    result = migrate_similar_questions()
+    if "--jsonb" in sys.argv[1:]:
+        # A value that is still not JSON would make the ALTER fail
+        if result["failed"]:
+            logger.error("Not converting the column to JSONB: fix the rows that failed to convert first")
+            result["jsonb"] = False
+        else:
+            result["jsonb"] = convert_column_to_jsonb()
+    print(json.dumps(result, indent=2))
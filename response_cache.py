@@ -0,0 +1,154 @@
+"""
+Persistent on-disk cache for LLM prompt responses
+"""
+import functools
+import hashlib
+import inspect
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration (overridable through environment variables)
+CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "true").lower() != "false"
+CACHE_PATH = os.environ.get(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite3")
+)
+# Entries older than this are ignored; 0 disables expiry
+CACHE_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL_SECONDS", 7 * 86400))
+
+# sqlite3 connections cannot be shared across threads, so keep one per thread
+_local = threading.local()
+
+def _get_connection() -> sqlite3.Connection:
+    """
+    Return this thread's cache connection, creating the cache table on first use.
+
+    Returns:
+        sqlite3.Connection: Connection to the cache database
+    """
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        connection = sqlite3.connect(CACHE_PATH, timeout=10)
+        # WAL mode lets concurrent processes read while another one writes
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, response TEXT, ts INTEGER)")
+        connection.commit()
+        _local.connection = connection
+    return connection
+
+def make_key(normalized_name: str, completion_args: Dict[str, Any], prompt: List[Dict[str, Any]], extra: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Compute the cache key for a prompt sent to a model.
+
+    Args:
+        normalized_name: Normalized model name (e.g. 'openai', 'anthropic')
+        completion_args: Static completion arguments of the model
+        prompt: List of message dictionaries sent to the model
+        extra: Additional per-call arguments that affect the response (optional)
+
+    Returns:
+        str: SHA-256 hex digest of the canonical JSON of the inputs
+    """
+    payload = orjson.dumps(
+        {"m": normalized_name, "a": completion_args, "p": prompt, "k": extra or {}},
+        option=orjson.OPT_SORT_KEYS,
+        default=str
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+def get_cached_response(key: str) -> Optional[str]:
+    """
+    Look up a cached response.
+
+    Args:
+        key: Cache key from make_key
+
+    Returns:
+        The cached response, or None on a miss or expired entry
+    """
+    min_ts = int(time.time()) - CACHE_TTL_SECONDS if CACHE_TTL_SECONDS > 0 else 0
+    try:
+        row = _get_connection().execute(
+            "SELECT response FROM cache WHERE key = ? AND ts > ?", (key, min_ts)
+        ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"Error reading LLM response cache: {str(e)}")
+        return None
+    return row[0] if row else None
+
+def store_response(key: str, response: str) -> None:
+    """
+    Store a response in the cache.
+
+    Args:
+        key: Cache key from make_key
+        response: The response to store
+    """
+    try:
+        connection = _get_connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (key, response, ts) VALUES (?, ?, ?)",
+            (key, response, int(time.time()))
+        )
+        connection.commit()
+    except sqlite3.Error as e:
+        logger.warning(f"Error writing LLM response cache: {str(e)}")
+
+def cached_response(config_getter: Callable[[str], Dict[str, Any]]) -> Callable:
+    """
+    Decorator that caches the responses of a prompt(prompt, model_name) function.
+
+    Works for both regular and async functions.
+
+    Args:
+        config_getter: Function returning the model configuration for a model name
+
+    Returns:
+        The decorator
+    """
+    def decorator(func):
+        def cache_key(prompt, model_name, kwargs):
+            try:
+                config = config_getter(model_name)
+            except ValueError:
+                # Unsupported model; let the wrapped function report it
+                return None
+            return make_key(config['normalized_name'], config['completion_args'], prompt, kwargs)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(prompt, model_name='openAI', **kwargs):
+                key = cache_key(prompt, model_name, kwargs) if CACHE_ENABLED else None
+                if key:
+                    cached = get_cached_response(key)
+                    if cached is not None:
+                        logger.info(f"LLM response cache hit for {model_name}")
+                        return cached
+                response = await func(prompt, model_name, **kwargs)
+                if key:
+                    store_response(key, response)
+                return response
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(prompt, model_name='openAI', **kwargs):
+            key = cache_key(prompt, model_name, kwargs) if CACHE_ENABLED else None
+            if key:
+                cached = get_cached_response(key)
+                if cached is not None:
+                    logger.info(f"LLM response cache hit for {model_name}")
+                    return cached
+            response = func(prompt, model_name, **kwargs)
+            if key:
+                store_response(key, response)
+            return response
+        return wrapper
+
+    return decorator
@@ -0,0 +1,283 @@
+"""
+In-process semantic cache of generated responses, keyed by requirement embedding
+
+Complements the database-side semantic cache in call_llm.py: it also sees the
+responses generated earlier in the same batch (which are only written to the
+database when the batch flushes) and, through a small file on disk, those of
+runs that finished moments ago. Entries record the requirement and model they
+were generated for: a requirement never gets its own earlier response back, and
+only responses of the requested model are reused. Runs save concurrently (one
+process per request), so each save merges the entries already on disk into its
+own under a file lock.
+"""
+import fcntl
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import List, Optional
+import numpy as np
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration (overridable through environment variables)
+CACHE_ENABLED = os.environ.get("LOCAL_SEMANTIC_CACHE_ENABLED", "true").lower() != "false"
+CACHE_PATH = os.environ.get(
+    "LOCAL_SEMANTIC_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "semantic_cache.npz")
+)
+# Held while merging into and replacing the cache file
+LOCK_PATH = CACHE_PATH + ".lock"
+# Entries older than this are ignored and evicted
+CACHE_TTL_SECONDS = int(os.environ.get("LOCAL_SEMANTIC_CACHE_TTL_SECONDS", 300))
+# Least recently used entries are evicted beyond this size
+CACHE_MAX_ENTRIES = int(os.environ.get("LOCAL_SEMANTIC_CACHE_MAX_ENTRIES", 1000))
+# A new entry this similar to an existing one of the same model replaces it
+# instead of being added
+DEDUP_THRESHOLD = 0.95
+
+_lock = threading.Lock()
+_loaded = False
+# Entries live in the first _size rows of preallocated arrays (CACHE_MAX_ENTRIES
+# rows, allocated once the embedding size is known), so adding or evicting an
+# entry never copies the whole cache: L2-normalized float32 embeddings, their
+# insertion and last-hit times, the IDs of the requirements they were generated
+# for, and the parallel lists of responses and of the models that generated them
+_size = 0
+_embeddings: Optional[np.ndarray] = None
+_timestamps: Optional[np.ndarray] = None
+_last_used: Optional[np.ndarray] = None
+_requirement_ids: Optional[np.ndarray] = None
+_responses: List[str] = []
+_models: List[str] = []
+
+def _allocate(dimensions: int) -> None:
+    """Allocate the entry arrays for embeddings of the given size."""
+    global _embeddings, _timestamps, _last_used, _requirement_ids
+    _embeddings = np.empty((CACHE_MAX_ENTRIES, dimensions), dtype=np.float32)
+    _timestamps = np.empty(CACHE_MAX_ENTRIES)
+    _last_used = np.empty(CACHE_MAX_ENTRIES)
+    _requirement_ids = np.empty(CACHE_MAX_ENTRIES, dtype=np.int64)
+
+def _normalize(embedding) -> Optional[np.ndarray]:
+    """
+    Convert an embedding to a unit-length float32 vector.
+
+    Args:
+        embedding: Sequence of floats
+
+    Returns:
+        The normalized vector, or None for a zero or mismatched vector
+    """
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    if norm == 0 or (_embeddings is not None and vector.shape[0] != _embeddings.shape[1]):
+        return None
+    return vector / norm
+
+def _read_file():
+    """
+    Read the live entries persisted on disk.
+
+    Returns:
+        tuple: (embeddings, timestamps, requirement IDs, responses, models) of the
+        live entries, oldest first, or None if there are none
+    """
+    if not os.path.exists(CACHE_PATH):
+        return None
+    try:
+        with np.load(CACHE_PATH) as data:
+            embeddings = data["embeddings"]
+            timestamps = data["timestamps"]
+            requirement_ids = data["requirement_ids"]
+            responses = orjson.loads(data["responses"].tobytes())
+            models = orjson.loads(data["models"].tobytes())
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning(f"Error reading semantic cache: {str(e)}")
+        return None
+
+    keep = np.flatnonzero(timestamps > time.time() - CACHE_TTL_SECONDS)
+    if not keep.size:
+        return None
+    keep = keep[np.argsort(timestamps[keep])]
+    return (embeddings[keep], timestamps[keep], requirement_ids[keep],
+            [responses[i] for i in keep], [models[i] for i in keep])
+
+def _load():
+    """Load the entries persisted by a previous run, dropping the expired ones."""
+    global _loaded, _size, _responses, _models
+    _loaded = True
+    entries = _read_file()
+    if entries is None:
+        return
+
+    # Keep the most recent live entries that fit
+    embeddings, timestamps, requirement_ids, responses, models = entries
+    start = max(len(timestamps) - CACHE_MAX_ENTRIES, 0)
+    if start < len(timestamps):
+        _allocate(embeddings.shape[1])
+        _size = len(timestamps) - start
+        _embeddings[:_size] = embeddings[start:]
+        _timestamps[:_size] = timestamps[start:]
+        _last_used[:_size] = timestamps[start:]
+        _requirement_ids[:_size] = requirement_ids[start:]
+        _responses = responses[start:]
+        _models = models[start:]
+
+def _best_match(vector, model, exclude_requirement_id=None):
+    """
+    Find the live entry of a model most similar to a normalized vector.
+
+    Args:
+        vector: Normalized embedding
+        model: Only entries generated by this model match
+        exclude_requirement_id: Entries generated for this requirement never match (optional)
+
+    Returns:
+        tuple: (entry index, cosine similarity), or (None, 0.0) if there is none
+    """
+    if not _size:
+        return None, 0.0
+    scores = _embeddings[:_size] @ vector
+    # Expired entries, and those of other models or of the excluded requirement, never match
+    scores[_timestamps[:_size] <= time.time() - CACHE_TTL_SECONDS] = -1.0
+    scores[[entry_model != model for entry_model in _models]] = -1.0
+    if exclude_requirement_id is not None:
+        scores[_requirement_ids[:_size] == exclude_requirement_id] = -1.0
+    index = int(np.argmax(scores))
+    return index, float(scores[index])
+
+def _remove(index):
+    """Remove one entry by moving the last entry into its slot."""
+    global _size
+    _size -= 1
+    if index != _size:
+        _embeddings[index] = _embeddings[_size]
+        _timestamps[index] = _timestamps[_size]
+        _last_used[index] = _last_used[_size]
+        _requirement_ids[index] = _requirement_ids[_size]
+        _responses[index] = _responses[_size]
+        _models[index] = _models[_size]
+    _responses.pop()
+    _models.pop()
+
+def lookup(embedding, threshold: float, requirement_id: int, model: str) -> Optional[str]:
+    """
+    Look up the cached response of the most similar other requirement.
+
+    Args:
+        embedding: Embedding of the requirement
+        threshold: Minimum cosine similarity for a hit
+        requirement_id: ID of the requirement; its own earlier responses never match
+        model: Normalized name of the model; only its responses match
+
+    Returns:
+        The cached response, or None on a miss
+    """
+    if not CACHE_ENABLED:
+        return None
+    with _lock:
+        if not _loaded:
+            _load()
+        vector = _normalize(embedding)
+        if vector is None:
+            return None
+        index, score = _best_match(vector, model, requirement_id)
+        if index is None or score < threshold:
+            return None
+        _last_used[index] = time.time()
+        logger.info(f"Local semantic cache hit (similarity {score:.4f})")
+        return _responses[index]
+
+def _add(vector, timestamp, last_used, requirement_id, response, model):
+    """
+    Add one entry with a normalized vector, replacing an older near-duplicate of
+    the same model and evicting the least recently used entry when the cache is full.
+    The entry is dropped instead if the near-duplicate is newer or every entry
+    was used more recently.
+    """
+    global _size
+    index, score = _best_match(vector, model)
+    if index is not None and score >= DEDUP_THRESHOLD:
+        if _timestamps[index] >= timestamp:
+            return
+        _remove(index)
+
+    if _size >= CACHE_MAX_ENTRIES:
+        index = int(np.argmin(_last_used[:_size]))
+        if _last_used[index] > last_used:
+            return
+        _remove(index)
+
+    if _embeddings is None:
+        _allocate(vector.shape[0])
+    _embeddings[_size] = vector
+    _timestamps[_size] = timestamp
+    _last_used[_size] = last_used
+    _requirement_ids[_size] = requirement_id
+    _responses.append(response)
+    _models.append(model)
+    _size += 1
+
+def store(embedding, response: str, requirement_id: int, model: str) -> None:
+    """
+    Add a generated response to the cache.
+
+    Args:
+        embedding: Embedding of the requirement
+        response: The generated response
+        requirement_id: ID of the requirement the response was generated for
+        model: Normalized name of the model that generated it
+    """
+    if not CACHE_ENABLED or not response or CACHE_MAX_ENTRIES <= 0:
+        return
+    with _lock:
+        if not _loaded:
+            _load()
+        vector = _normalize(embedding)
+        if vector is None:
+            return
+        # A near-duplicate of an existing entry refreshes it instead of adding another
+        now = time.time()
+        _add(vector, now, now, requirement_id, response, model)
+
+def _merge_file():
+    """Merge the live entries on disk, such as those saved by concurrent runs, into the cache."""
+    entries = _read_file()
+    if entries is None or entries[0].shape[1] != _embeddings.shape[1]:
+        return
+    for vector, timestamp, requirement_id, response, model in zip(*entries):
+        _add(vector, timestamp, timestamp, requirement_id, response, model)
+
+def save() -> None:
+    """Persist the live entries to disk for the next run, merged with those already there."""
+    if not CACHE_ENABLED:
+        return
+    with _lock:
+        if not _loaded or not _size:
+            return
+        tmp_path = None
+        try:
+            # Concurrent savers take turns, each keeping what the previous ones wrote
+            with open(LOCK_PATH, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                _merge_file()
+
+                # Write to a temporary file first so concurrent readers never see a partial file
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(CACHE_PATH) or ".", suffix=".npz")
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(
+                        f,
+                        embeddings=_embeddings[:_size],
+                        timestamps=_timestamps[:_size],
+                        requirement_ids=_requirement_ids[:_size],
+                        responses=np.frombuffer(orjson.dumps(_responses), dtype=np.uint8),
+                        models=np.frombuffer(orjson.dumps(_models), dtype=np.uint8)
+                    )
+                os.replace(tmp_path, CACHE_PATH)
+        except OSError as e:
+            logger.warning(f"Error writing semantic cache: {str(e)}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -374,7 +374,7 @@ export class DatabaseStorage implements IStorage {
           ? response.moaResponse 
           : null,
         
-        similarQuestions: response.similarQuestions || ''
+        similarQuestions: response.similarQuestions || null
       };
       
       // Log model-specific fields for debugging
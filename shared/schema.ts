@@ -46,7 +46,8 @@ export const excelRequirementResponses = pgTable("excel_requirement_responses",
   deepseekResponse: text("deepseek_response"),
   moaResponse: text("moa_response"),
   
-  // Similar questions (stored as JSON string)
+  // Similar questions (stored as JSON string; `python migrate_similar_questions.py --jsonb`
+  // converts the column to jsonb, after which this should be declared with jsonb())
   similarQuestions: text("similar_questions"),
   
   // Metadata
@@ -54,6 +55,8 @@ export const excelRequirementResponses = pgTable("excel_requirement_responses",
   rating: integer("rating"),
   feedback: text("feedback"),  // 'positive', 'negative', or null
   modelProvider: text("model_provider"),
+  // Note: the semantic cache columns (requirement_embedding vector, generated_at timestamp)
+  // are created using raw SQL by `python database.py create-indexes` and only used from Python
 });
 
 // Table for storing reference information